@@ -2,6 +2,7 @@ import streamlit as st
 from FinChatbot.pipeline.llm_chain import (ArithmeticLLM,
                                            SpanLLM)
 from FinChatbot.pipeline.classification import model_predict
+from FinChatbot.pipeline.ingest import revision_key
 from FinChatbot.pipeline.model_classification import predict_query
 import os
 from dotenv import find_dotenv, load_dotenv
@@ -119,6 +120,22 @@ def store_session_in_dynamodb(u_id, s_id, question, answer):
     except Exception as e:
         st.error(f"Failed to store session data: {e}")
 
+@st.fragment(run_every=2)
+def display_ingest_progress():
+    """Indexing progress of the current document, refreshed while it is ingested in the background."""
+    span_chain = st.session_state.get("span_chain")
+    if span_chain is None:
+        return
+
+    pages_done, pages_total = span_chain.progress
+    if span_chain.error is not None:
+        st.error(f"Indexing stopped after {pages_done} of {pages_total} pages: {span_chain.error}")
+    elif not span_chain.is_ready:
+        st.progress(pages_done / pages_total if pages_total else 0.0,
+                    text=f"Indexing pages: {pages_done}/{pages_total}. Answers use the pages indexed so far.")
+    else:
+        st.caption(f"All {pages_total} pages indexed.")
+
 # Main Application
 def main():
     st.title("Fin-Tech ChatBot")
@@ -144,12 +161,18 @@ def main():
         if pdf_file and st.button("Process Document"):
             with st.spinner("Processing..."):
                 try:
-                    st.session_state["span_chain"] = SpanLLM(pdf_file)
+                    # Ingest continues in the background; questions can be asked right away
+                    # Revisions of a filing are recognized per user, so only its changed pages are processed
+                    st.session_state["span_chain"] = SpanLLM(
+                        pdf_file, doc_key=revision_key(st.session_state["u_id"], pdf_file.name)
+                    )
                     st.session_state["arithmetic_chain"] = ArithmeticLLM()
-                    st.success("Document processed successfully!")
+                    st.success("Document is being indexed, you can start asking questions.")
                 except Exception as e:
                     st.error(f"Failed to process document: {e}")
 
+        display_ingest_progress()
+
     # Display chat messages
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
@@ -173,7 +196,7 @@ def main():
                         if query_type == "span":
                             response = st.session_state["span_chain"].get_response(prompt)
                         elif query_type == "arithmetic":
-                            context = st.session_state["span_chain"].retriever.invoke(prompt)
+                            context = st.session_state["span_chain"].get_context(prompt, normalized_tables=True)
                             whole_response = st.session_state["arithmetic_chain"].get_response(prompt, context)
                             response = whole_response["Answer"]
                         
@@ -71,11 +71,11 @@ def process_pdf():
 
 def answer_query_from_pdf(query, tables, texts):
     for table in tables:
-        if query.lower() in table.lower():
+        if query.lower() in str(table).lower():
             return f"Answer found in table: {table}"
 
     for text in texts:
-        if query.lower() in text.lower():
+        if query.lower() in str(text).lower():
             return f"Answer found in text: {text}"
 
     return None
@@ -11,8 +11,7 @@ from unstructured_ingest.v2.processes.connectors.local import (
     LocalUploaderConfig
 )
 from unstructured_ingest.v2.processes.partitioner import PartitionerConfig
-from bs4 import BeautifulSoup
-from io import StringIO
+from FinChatbot.pipeline.tables import normalize_table
 from IPython.core.display import HTML
 import streamlit as st
 
@@ -52,17 +51,8 @@ def extract_pdf_data(pdf_path):
     for table in tables["metadata"].values:
         all_tables.append(table["text_as_html"])
 
-    # Clean HTML Tables
-    soup = BeautifulSoup(all_tables[0], "html.parser")
-    for td in soup.find_all("td"):
-        if td.string:
-            td.string = td.string.replace("$", "").strip()
-        if not td.string:
-            td.decompose()
-
-    cleaned_html = soup.prettify()
-    df_list = pd.read_html(StringIO(cleaned_html))
-    return df_list[0]
+    # Parse the table into typed numeric columns
+    return normalize_table(all_tables[0]).to_dataframe()
 
 # Streamlit UI setup
 st.set_page_config(page_title="Financial Chatbot", layout='wide')
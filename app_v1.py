@@ -1,5 +1,5 @@
 import os
-import pandas as pd
+import hashlib
 from nltk.tokenize import word_tokenize
 import nltk
 nltk.download('punkt')
@@ -16,8 +16,8 @@ from unstructured_ingest.v2.processes.partitioner import PartitionerConfig
 from werkzeug.utils import secure_filename
 import streamlit as st
 from dotenv import load_dotenv, find_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from FinChatbot.pipeline.elements import iter_elements_from_file
+from FinChatbot.pipeline.vectorstores import open_sparse_index
 
 load_dotenv()
 
@@ -45,18 +45,17 @@ def extract_pdf_data(pdf_path):
     )
     pipeline.run()
 
-    # Load processed data
-    processed_data = pd.read_json(f"./processed_pdf/{os.path.basename(pdf_path)}.json")
-    return processed_data
+    # Path of the processed data; it is streamed rather than loaded in one go
+    return f"./processed_pdf/{os.path.basename(pdf_path)}.json"
 
 
 # Function to preprocess extracted data
-def preprocess_pdf_data(processed_data):
+def preprocess_pdf_data(processed_path):
     try:
-        # Extract text content from JSON
+        # Stream text content out of the JSON one element at a time
         paragraphs = []
-        for index, row in processed_data.iterrows():
-            content = row.get("text")  # Adjust key based on your JSON structure
+        for element in iter_elements_from_file(processed_path):
+            content = element.get("text")  # Adjust key based on your JSON structure
             if isinstance(content, str) and content.strip():
                 paragraphs.append(content.strip())
 
@@ -71,31 +70,28 @@ def preprocess_pdf_data(processed_data):
         raise
 
 # TF-IDF Model Initialization
-def initialize_tfidf_model(paragraphs):
+def initialize_tfidf_model(paragraphs, doc_hash):
     try:
         if not paragraphs or not any(paragraphs):
             raise ValueError("No valid paragraphs found for TF-IDF model initialization.")
 
-        # Initialize and fit the TF-IDF vectorizer
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform(paragraphs)
-        return vectorizer, tfidf_matrix, paragraphs
+        # Reuse the index saved for this document; fit and save it on first upload
+        index = open_sparse_index(doc_hash, backend="tfidf")
+        ids = [str(i) for i in range(len(paragraphs))]
+        if index.ids() != set(ids):
+            index.delete(index.ids())
+            index.add(ids, paragraphs)
+            index.save()
+        return index, paragraphs
     except Exception as e:
         st.error(f"Error initializing TF-IDF model: {e}")
         raise
 
 # Function to handle chatbot queries
-def retrieve_context_tfidf(question, vectorizer, tfidf_matrix, paragraphs, top_k=3):
+def retrieve_context_tfidf(question, index, paragraphs, top_k=3):
     try:
-        # Vectorize the question
-        question_vector = vectorizer.transform([question])
-
-        # Calculate cosine similarity
-        similarity_scores = cosine_similarity(question_vector, tfidf_matrix).flatten()
-
-        # Get top-k most similar paragraphs
-        top_indices = similarity_scores.argsort()[-top_k:][::-1]
-        return [paragraphs[i] for i in top_indices]
+        # Top-k most similar paragraphs by cosine similarity
+        return [paragraphs[int(doc_id)] for doc_id, _ in index.search(question, top_k)]
     except Exception as e:
         st.error(f"Error retrieving context: {e}")
         raise
@@ -110,16 +106,17 @@ if uploaded_file:
     with st.spinner("Processing PDF..."):
         # Save uploaded PDF temporarily
         temp_pdf_path = f"./temp_uploaded_file.pdf"
+        file_bytes = uploaded_file.read()
         with open(temp_pdf_path, "wb") as f:
-            f.write(uploaded_file.read())
+            f.write(file_bytes)
 
         # Extract and preprocess data
         try:
-            processed_data = extract_pdf_data(temp_pdf_path)
-            paragraphs = preprocess_pdf_data(processed_data)
+            processed_path = extract_pdf_data(temp_pdf_path)
+            paragraphs = preprocess_pdf_data(processed_path)
 
             # Initialize TF-IDF model
-            vectorizer, tfidf_matrix, contexts = initialize_tfidf_model(paragraphs)
+            tfidf_index, contexts = initialize_tfidf_model(paragraphs, hashlib.sha256(file_bytes).hexdigest())
             st.sidebar.success("PDF processed successfully!")
         except Exception as e:
             st.sidebar.error(f"Failed to process the PDF: {e}")
@@ -131,7 +128,7 @@ if uploaded_file:
     if question:
         with st.spinner("Searching for answers..."):
             try:
-                results = retrieve_context_tfidf(question, vectorizer, tfidf_matrix, contexts)
+                results = retrieve_context_tfidf(question, tfidf_index, contexts)
                 st.subheader("Answers:")
                 for i, answer in enumerate(results, start=1):
                     st.write(f"**{i}.** {answer}")
@@ -0,0 +1,142 @@
+'''
+Extraction throughput benchmark.
+
+Runs every extraction path at several concurrency levels against the local Unstructured
+stand-in (benchmarks/unstructured_stub.py) and reports pages/sec, p50/p95 latency and peak
+RSS. Each measurement runs in a fresh process with the extraction cache disabled, so runs
+do not warm each other up.
+
+    python benchmarks/extraction_benchmark.py --pdf report.pdf --concurrency 1 2 4 8 --repeat 5
+'''
+
+import os
+import sys
+import json
+import time
+import socket
+import resource
+import tempfile
+import argparse
+import subprocess
+import statistics
+import urllib.request
+
+STUB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "unstructured_stub.py")
+PATHS = ["get_data", "process_pdf_parallel", "pdfplumber", "pymupdf"]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children, in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KB on Linux
+    return (own + children) / scale
+
+def run_worker(path, concurrency, pdf_path, repeat):
+    """Measure one extraction path in this process; prints a JSON result line."""
+    # Configure the pipeline before it is imported: no cache, pool sized to the concurrency
+    cache_dir = tempfile.mkdtemp(prefix="extraction-bench-")
+    os.environ["EXTRACTION_CACHE_DIR"] = cache_dir
+    os.environ["EXTRACTION_CACHE_MAX_MB"] = "0"
+    os.environ["UNSTRUCTURED_MAX_CONCURRENCY"] = str(concurrency)
+
+    from pypdf import PdfReader
+    from FinChatbot.pipeline.extraction import get_data
+    from FinChatbot.pipeline.extractors import extract_elements
+    from FinChatbot.pipeline.pdfprocessing import process_pdf_parallel
+
+    with open(pdf_path, "rb") as f:
+        file_bytes = f.read()
+    num_pages = len(PdfReader(pdf_path).pages)
+
+    runners = {
+        "get_data": lambda: get_data(file_bytes),
+        "process_pdf_parallel": lambda: process_pdf_parallel(file_bytes, num_chunks=concurrency),
+        "pdfplumber": lambda: extract_elements(file_bytes, backend="pdfplumber", max_workers=concurrency),
+        "pymupdf": lambda: extract_elements(file_bytes, backend="pymupdf", max_workers=concurrency),
+    }
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        runners[path]()
+        latencies.append(time.perf_counter() - started)
+
+    print(json.dumps({
+        "path": path,
+        "concurrency": concurrency,
+        "pages": num_pages,
+        "pages_per_sec": num_pages / statistics.mean(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "peak_rss_mb": peak_rss_mb()
+    }))
+
+def wait_for_stub(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Unstructured stand-in did not start")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction paths")
+    parser.add_argument("--pdf", required=True, help="PDF to extract")
+    parser.add_argument("--paths", nargs="+", default=PATHS, choices=PATHS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--url", help="Partition endpoint; defaults to a local stand-in started here")
+    parser.add_argument("--stub-args", default="", help="Extra arguments for the local stand-in, e.g. '--error-rate 0.05'")
+    parser.add_argument("--worker", nargs=2, metavar=("PATH", "CONCURRENCY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]), args.pdf, args.repeat)
+        return
+
+    stub = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        stub = subprocess.Popen([sys.executable, STUB_PATH, "--port", str(port), *args.stub_args.split()])
+        wait_for_stub(port)
+        url = f"http://127.0.0.1:{port}/general/v0/general"
+
+    env = {**os.environ, "UNSTRUCTURED_API_URL": url}
+    results = []
+    try:
+        for path in args.paths:
+            for concurrency in args.concurrency:
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--pdf", args.pdf, "--repeat", str(args.repeat),
+                     "--worker", path, str(concurrency)],
+                    env=env, capture_output=True, text=True
+                )
+                if completed.returncode != 0:
+                    print(f"{path} x{concurrency} failed:\n{completed.stderr}", file=sys.stderr)
+                    continue
+                results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+
+    print(f"{'path':<22}{'conc':>6}{'pages':>7}{'pages/s':>10}{'p50 s':>9}{'p95 s':>9}{'peak MB':>10}")
+    for r in results:
+        print(f"{r['path']:<22}{r['concurrency']:>6}{r['pages']:>7}{r['pages_per_sec']:>10.2f}"
+              f"{r['p50']:>9.2f}{r['p95']:>9.2f}{r['peak_rss_mb']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+'''
+Local stand-in for the Unstructured partition endpoint.
+
+Replays a recorded element JSON file (e.g. processed_pdf/temp_uploaded_file.pdf.json) for
+every uploaded PDF, with configurable latency and injected errors, so extraction paths can
+be benchmarked without calling the paid API.
+
+    python benchmarks/unstructured_stub.py --port 8900 --latency-ms 300 --per-page-ms 150 --error-rate 0.05
+
+Then point UNSTRUCTURED_API_URL at http://127.0.0.1:8900/general/v0/general.
+'''
+
+import io
+import json
+import random
+import asyncio
+import argparse
+from aiohttp import web
+from pypdf import PdfReader
+
+DEFAULT_RECORDING = "./processed_pdf/temp_uploaded_file.pdf.json"
+
+def load_recording(path):
+    """Group the recorded elements by page so they can be replayed for any page range."""
+    with open(path, "r", encoding="utf-8") as f:
+        elements = json.load(f)
+
+    pages = {}
+    for element in elements:
+        page_number = (element.get("metadata") or {}).get("page_number", 1)
+        pages.setdefault(page_number, []).append(element)
+    return [pages[number] for number in sorted(pages)]
+
+def replay(recorded_pages, num_pages, starting_page_number):
+    """Elements for num_pages pages starting at starting_page_number, cycling through the recording."""
+    elements = []
+    for offset in range(num_pages):
+        page_number = starting_page_number + offset
+        for element in recorded_pages[(page_number - 1) % len(recorded_pages)]:
+            element = dict(element)
+            element["metadata"] = {**element.get("metadata", {}), "page_number": page_number}
+            elements.append(element)
+    return elements
+
+def create_app(recording=DEFAULT_RECORDING, latency_ms=200, per_page_ms=100, jitter=0.2,
+               error_rate=0.0, rate_limit_rate=0.0, stream_chunk_size=16 * 1024):
+    recorded_pages = load_recording(recording)
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    async def partition(request):
+        stats["requests"] += 1
+        form = await request.post()
+        upload = form.get("files")
+        if upload is None:
+            return web.Response(status=422, text="files field is required")
+
+        pdf_bytes = upload.file.read()
+        try:
+            num_pages = len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+        except Exception:
+            return web.Response(status=400, text="Invalid PDF")
+        starting_page_number = int(form.get("starting_page_number", 1))
+
+        # Simulated partitioning time grows with the number of pages
+        delay = (latency_ms + per_page_ms * num_pages) / 1000
+        await asyncio.sleep(delay * random.uniform(1 - jitter, 1 + jitter))
+
+        roll = random.random()
+        if roll < rate_limit_rate:
+            stats["rate_limited"] += 1
+            return web.Response(status=429, text="Too many requests", headers={"Retry-After": "1"})
+        if roll < rate_limit_rate + error_rate:
+            stats["errors"] += 1
+            return web.Response(status=random.choice([500, 502, 503]), text="Injected error")
+
+        body = json.dumps(replay(recorded_pages, num_pages, starting_page_number)).encode("utf-8")
+
+        # Chunked response, like the real API for large documents
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        for start in range(0, len(body), stream_chunk_size):
+            await response.write(body[start:start + stream_chunk_size])
+        await response.write_eof()
+        return response
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=512 * 1024 * 1024)
+    app.router.add_post("/general/v0/general", partition)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Unstructured partition API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--recording", default=DEFAULT_RECORDING, help="Recorded element JSON to replay")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Fixed latency per request")
+    parser.add_argument("--per-page-ms", type=float, default=100, help="Additional latency per page")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429")
+    args = parser.parse_args()
+
+    app = create_app(
+        recording=args.recording,
+        latency_ms=args.latency_ms,
+        per_page_ms=args.per_page_ms,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+'''
+Vectorstore backend benchmark.
+
+Indexes synthetic summary embeddings at filing sizes with the chroma, faiss and numpy
+backends and reports build time, time to reopen the saved index, single-query p50/p95
+latency, batched query throughput and recall@k against exact search. Every build and every
+reopen runs in a fresh process, so no backend is measured on warm caches.
+
+    python benchmarks/vectorstore_benchmark.py --sizes 500 2000 5000 --dim 1536 --queries 200
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+import statistics
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BACKENDS = ["chroma", "faiss", "numpy"]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+class LookupEmbeddings(Embeddings):
+    """Serves the pre-generated vector of "doc-{i}" texts, so no model is called."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[int(text.split("-")[1])].tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def make_data(size, dim, queries, k, data_dir):
+    """Clustered unit vectors, queries near random documents, and their exact top k."""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(1, size // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.standard_normal((size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors = vectors[rng.integers(0, size, queries)] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :k]
+
+    np.save(os.path.join(data_dir, "vectors.npy"), vectors)
+    np.save(os.path.join(data_dir, "queries.npy"), query_vectors)
+    np.save(os.path.join(data_dir, "exact.npy"), exact)
+
+def build(backend, embeddings, texts, index_dir):
+    if backend == "chroma":
+        import chromadb
+        from langchain_community.vectorstores import Chroma
+        store = Chroma(client=chromadb.PersistentClient(path=index_dir), collection_name="bench", embedding_function=embeddings)
+        # Chroma caps the batch size of a single add
+        for start in range(0, len(texts), 5000):
+            store.add_texts(texts[start:start + 5000], ids=texts[start:start + 5000])
+    elif backend == "faiss":
+        from langchain_community.vectorstores import FAISS
+        store = FAISS.from_texts(texts, embeddings, ids=texts)
+        store.save_local(index_dir)
+    else:
+        from FinChatbot.pipeline.numpy_store import NumpyVectorStore
+        store = NumpyVectorStore(embeddings, path=index_dir)
+        store.add_texts(texts, ids=texts)
+        store.save()
+
+def reopen(backend, embeddings, index_dir):
+    if backend == "chroma":
+        import chromadb
+        from langchain_community.vectorstores import Chroma
+        return Chroma(client=chromadb.PersistentClient(path=index_dir), collection_name="bench", embedding_function=embeddings)
+    if backend == "faiss":
+        from langchain_community.vectorstores import FAISS
+        return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    from FinChatbot.pipeline.numpy_store import NumpyVectorStore
+    return NumpyVectorStore.load(embeddings, index_dir)
+
+def search_batch(backend, store, query_vectors, k):
+    """Ids of the top k for every query, in one call where the backend has one."""
+    if backend == "chroma":
+        return store._collection.query(query_embeddings=query_vectors.tolist(), n_results=k, include=[])["ids"]
+    if backend == "faiss":
+        _, rows = store.index.search(query_vectors, k)
+        return [[store.index_to_docstore_id[i] for i in row if i >= 0] for row in rows]
+    return [[doc.id for doc, _ in hits] for hits in store.similarity_search_by_vector_batch(query_vectors, k)]
+
+def run_worker(phase, backend, data_dir, index_dir, k):
+    """Build or reopen-and-query one backend in this process; prints a JSON result line."""
+    vectors = np.load(os.path.join(data_dir, "vectors.npy"))
+    embeddings = LookupEmbeddings(vectors)
+    texts = [f"doc-{i}" for i in range(len(vectors))]
+
+    if phase == "build":
+        started = time.perf_counter()
+        build(backend, embeddings, texts, index_dir)
+        print(json.dumps({"build_s": time.perf_counter() - started}))
+        return
+
+    query_vectors = np.load(os.path.join(data_dir, "queries.npy"))
+    exact = np.load(os.path.join(data_dir, "exact.npy"))
+
+    started = time.perf_counter()
+    store = reopen(backend, embeddings, index_dir)
+    # First search included: an mmap'd or lazily loaded index pays for its load here
+    store.similarity_search_by_vector(query_vectors[0].tolist(), k=k)
+    open_s = time.perf_counter() - started
+
+    latencies = []
+    for query in query_vectors:
+        query = query.tolist()
+        started = time.perf_counter()
+        store.similarity_search_by_vector(query, k=k)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    results = search_batch(backend, store, query_vectors, k)
+    batch_s = time.perf_counter() - started
+
+    recall = statistics.mean(
+        len({int(doc_id.split("-")[1]) for doc_id in found} & set(expected.tolist())) / k
+        for found, expected in zip(results, exact)
+    )
+    print(json.dumps({
+        "open_s": open_s,
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "batch_qps": len(query_vectors) / batch_s,
+        "recall": recall
+    }))
+
+def run_phase(phase, backend, data_dir, index_dir, k):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--k", str(k),
+         "--worker", phase, backend, data_dir, index_dir],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorstore backends on filing-sized indexes")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[500, 2000, 5000], help="Summaries per filing")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--worker", nargs=4, metavar=("PHASE", "BACKEND", "DATA_DIR", "INDEX_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker, args.k)
+        return
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="vectorstore-bench-")
+    try:
+        for size in args.sizes:
+            data_dir = os.path.join(work_dir, f"data-{size}")
+            os.makedirs(data_dir)
+            make_data(size, args.dim, args.queries, args.k, data_dir)
+            for backend in args.backends:
+                index_dir = os.path.join(work_dir, f"{backend}-{size}")
+                try:
+                    result = run_phase("build", backend, data_dir, index_dir, args.k)
+                    result.update(run_phase("query", backend, data_dir, index_dir, args.k))
+                except RuntimeError as e:
+                    print(f"{backend} x{size} failed:\n{e}", file=sys.stderr)
+                    continue
+                results.append({"backend": backend, "size": size, **result})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'backend':<9}{'size':>7}{'build s':>9}{'open s':>9}{'p50 ms':>9}{'p95 ms':>9}{'batch q/s':>11}{'recall':>8}")
+    for r in results:
+        print(f"{r['backend']:<9}{r['size']:>7}{r['build_s']:>9.2f}{r['open_s']:>9.3f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['batch_qps']:>11.0f}{r['recall']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,13 @@
 import os
-import io
 import sqlite3
 import streamlit as st
-import pdfplumber
 import requests
 from dotenv import load_dotenv
 import json
 import pandas as pd
 import logging
 import re
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextContainer, LTChar
+from FinChatbot.pipeline.extractors import extract_financial_pages
 
 # Load environment variables
 load_dotenv()
@@ -65,41 +62,31 @@ class PDFProcessor:
             new_columns.append(new_col)
         return new_columns
 
+    @staticmethod
+    def to_dataframe(rows):
+        """Build a DataFrame from raw rows, using the first row as headers"""
+        headers = [str(cell).strip() for cell in rows[0]]
+        clean_headers = PDFProcessor.sanitize_columns(headers)
+        width = len(clean_headers)
+        body = [(list(row) + [None] * width)[:width] for row in rows[1:]]
+        return pd.DataFrame(body, columns=clean_headers)
+
     @staticmethod
     def extract_financial_data(file_bytes):
         texts = []
         tables = []
 
         try:
-            # First pass with pdfplumber
-            with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        texts.append(text.strip())
-                    
-                    # Process visual tables
-                    for table in page.extract_tables():
-                        if table and len(table) > 1:
-                            headers = [str(cell).strip() for cell in table[0]]
-                            clean_headers = PDFProcessor.sanitize_columns(headers)
-                            df = pd.DataFrame(table[1:], columns=clean_headers)
-                            tables.append(df)
-
-            # Second pass with PDFMiner
-            for page_layout in extract_pages(io.BytesIO(file_bytes)):
-                for element in page_layout:
-                    if isinstance(element, LTTextContainer):
-                        fonts = [char.fontname for char in element if isinstance(char, LTChar)]
-                        if len(set(fonts)) == 1:
-                            lines = [line.strip() for line in element.get_text().split('\n')]
-                            if any(re.search(r'\$?\d+(?:\.\d+)?%?', line) for line in lines):
-                                table_data = [re.split(r'\s{2,}', line) for line in lines]
-                                if len(table_data) > 1:
-                                    headers = [cell.strip() for cell in table_data[0]]
-                                    clean_headers = PDFProcessor.sanitize_columns(headers)
-                                    df = pd.DataFrame(table_data[1:], columns=clean_headers)
-                                    tables.append(df)
+            # Single pass per page, spread across worker processes and merged in page order
+            for page in extract_financial_pages(file_bytes):
+                if page["text"]:
+                    texts.append(page["text"])
+
+                # Visual tables first, then single-font numeric text blocks
+                for table in page["tables"] + page["numeric_blocks"]:
+                    tables.append(PDFProcessor.to_dataframe(table))
+
+                logger.info(f"Page {page['page_number']} processed in {page['seconds']:.3f}s")
 
         except Exception as e:
             logger.error(f"PDF processing error: {str(e)}")
@@ -61,7 +61,7 @@ class SpanLLM:
             
             # Optimize text chunking
             text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-            texts = text_splitter.split_text(" ".join(texts))
+            texts = text_splitter.split_text(" ".join(str(text) for text in texts))
             
             # Create vectorstore
             if vectorstore_type.lower() == 'chroma':
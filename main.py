@@ -1,10 +1,13 @@
+import hashlib
 import streamlit as st
 from dotenv import load_dotenv, find_dotenv
+from FinChatbot.pipeline.dedupe import dedupe_elements
+from FinChatbot.pipeline.embeddings import cached_embeddings
 from FinChatbot.pipeline.extraction import get_data
-from FinChatbot.pipeline.summarizer import get_summary
+from FinChatbot.pipeline.summarizer import SummaryReport, get_summary
 from FinChatbot.pipeline.mvr import create_multi_vector_retriever
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from FinChatbot.pipeline.vectorstores import open_document_collection, open_sparse_index
+from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.schema.runnable import RunnablePassthrough
@@ -21,22 +24,30 @@ def create_chain(pdf_file):
     # Getting tables and texts
     tables, texts = get_data(file_bytes = file_bytes)
 
+    # Dropping repeated headers, footers and boilerplate before summarizing
+    tables, texts, report = dedupe_elements(tables, texts)
+    print(report)
+
     # Getting tables and texts summaries
-    table_summaries, text_summaries = get_summary(tables, texts)
+    summary_report = SummaryReport()
+    table_summaries, text_summaries = get_summary(tables, texts, report = summary_report)
+    print(summary_report)
 
-    # Creating MVR and retriever
-    vectorstore = Chroma(
-        collection_name = "rag-model",
-        embedding_function = OpenAIEmbeddings()
-    )
+    # Creating MVR and retriever over the document's persisted collection, fused with the sparse index
+    doc_hash = hashlib.sha256(file_bytes).hexdigest()
+    vectorstore = open_document_collection(doc_hash, cached_embeddings(), doc_key = getattr(pdf_file, "name", None))
+    sparse_index = open_sparse_index(doc_hash)
 
     retriever = create_multi_vector_retriever(
         vectorstore = vectorstore,
         table_summaries = table_summaries,
         tables = tables,
         text_summaries = text_summaries,
-        texts = texts
+        texts = texts,
+        doc_hash = doc_hash,
+        sparse_index = sparse_index
     )
+    sparse_index.save()
 
     # Enhanced prompt template with conversation history
     template = """Previous conversation:
@@ -0,0 +1,246 @@
+'''
+Resumable bulk ingestion of a filing library.
+
+Walks a local directory or an S3 prefix laid out like the admin panel uploads
+({sector}/{user}/{timestamp}_{filename}), extracts, summarizes and indexes every PDF in a
+bounded worker pool into the same per-document collection, sparse index and docstore entries
+the chat app opens, and checkpoints each finished document so an interrupted run picks up
+where it stopped.
+
+    python -m FinChatbot.pipeline.bulk_ingest ./filings --workers 4
+    python -m FinChatbot.pipeline.bulk_ingest s3://my-bucket/finance/ --workers 8 --extractor unstructured
+'''
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv, find_dotenv
+from FinChatbot.pipeline.embeddings import cached_embeddings
+from FinChatbot.pipeline.ingest import PageManifest, content_hash, ingest_document, revision_key
+from FinChatbot.pipeline.mvr import add_documents
+from FinChatbot.pipeline.vectorstores import open_document_retriever, save_document_retriever
+
+load_dotenv(find_dotenv())
+
+BULK_INGEST_CHECKPOINT = os.getenv("BULK_INGEST_CHECKPOINT", "./processed_pdf/bulk_ingest_checkpoint.jsonl")
+
+# {timestamp}_{filename} as written by upload_pdf in pages/admin_panel.py
+UPLOAD_NAME_PATTERN = re.compile(r"^\d{14}_(?P<name>.+)$")
+
+class SourceDocument:
+    """A PDF to ingest: where it came from, which version it is, and how to read it."""
+
+    def __init__(self, source_id, version, doc_key, read):
+        self.source_id = source_id
+        self.version = version
+        self.doc_key = doc_key
+        self.read = read
+
+def doc_key_from_path(path):
+    """
+    Document key for a stored file: the revision key of its user directory and file name.
+    Upload keys carry a timestamp prefix that is stripped, so the key matches the one the
+    chat app uses when that user uploads the file, and both share a manifest.
+    """
+    parts = path.replace("\\", "/").split("/")
+    match = UPLOAD_NAME_PATTERN.match(parts[-1])
+    name = match.group("name") if match else parts[-1]
+    return revision_key(parts[-2], name) if len(parts) > 1 and parts[-2] else name
+
+def iter_local_documents(root):
+    """Every PDF below a local directory, in a stable order."""
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+
+            def read(path=path):
+                with open(path, "rb") as f:
+                    return f.read()
+
+            yield SourceDocument(
+                source_id=os.path.relpath(path, root),
+                version=f"{stat.st_size}-{int(stat.st_mtime)}",
+                doc_key=doc_key_from_path(path),
+                read=read
+            )
+
+def iter_s3_documents(bucket, prefix="", s3=None):
+    """Every PDF under an S3 prefix, using the object ETag as its version."""
+    if s3 is None:
+        import boto3
+        s3 = boto3.client("s3")
+
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            key = item["Key"]
+            if not key.lower().endswith(".pdf"):
+                continue
+
+            def read(key=key):
+                return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+            yield SourceDocument(
+                source_id=f"s3://{bucket}/{key}",
+                version=item.get("ETag", "").strip('"'),
+                doc_key=doc_key_from_path(key),
+                read=read
+            )
+
+def iter_documents(source):
+    """Local directory or s3://bucket/prefix."""
+    if source.startswith("s3://"):
+        bucket, _, prefix = source[len("s3://"):].partition("/")
+        return iter_s3_documents(bucket, prefix)
+    return iter_local_documents(source)
+
+class Checkpoint:
+    """Append-only JSON lines log of finished documents, used to skip them on the next run."""
+
+    def __init__(self, path=BULK_INGEST_CHECKPOINT):
+        self.path = path
+        self._lock = threading.Lock()
+        self.completed = set()
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by a crash
+                    if record.get("status") == "done":
+                        self.completed.add((record["source_id"], record["version"]))
+        except OSError:
+            pass
+
+    def is_done(self, document):
+        return (document.source_id, document.version) in self.completed
+
+    def record(self, document, status, **fields):
+        record = {"source_id": document.source_id, "version": document.version, "status": status, **fields}
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if status == "done":
+                self.completed.add((document.source_id, document.version))
+
+def ingest_one(document, extractor=None, embeddings=None, summary_backend=None, vectorstore_type="chroma"):
+    """
+    Extract, summarize and index one document as SpanLLM does: its page manifest, and its
+    collection ('chroma' or 'numpy'), sparse index and docstore entries keyed by the hash of
+    its bytes. Returns stats.
+    """
+    started = time.perf_counter()
+    file_bytes = document.read()
+
+    manifest = PageManifest.load(document.doc_key)
+    doc_hash = content_hash(file_bytes)
+    retriever = open_document_retriever(doc_hash, embeddings or cached_embeddings(), vectorstore_type,
+                                        doc_key=document.doc_key)
+    result = ingest_document(file_bytes, manifest, extractor=extractor, summary_backend=summary_backend)
+
+    add_documents(retriever, result.text_summaries, result.texts, doc_hash)
+    add_documents(retriever, result.table_summaries, result.tables, doc_hash)
+    save_document_retriever(retriever)
+    manifest.save(result.page_hashes)
+
+    return {
+        "doc_key": document.doc_key,
+        "pages": len(result.page_hashes),
+        "changed_pages": len(result.changed_pages),
+        "elements": len(result.table_summaries) + len(result.text_summaries),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+def run_bulk_ingest(documents, workers=4, checkpoint=None, extractor=None, report_every=10, summary_backend=None,
+                    vectorstore_type="chroma"):
+    """
+    Ingest documents with at most `workers` in flight, skipping the ones already in the
+    checkpoint. Failures are recorded and do not stop the run. Returns a summary dict.
+    """
+    if vectorstore_type.lower() not in ("chroma", "numpy"):
+        # A FAISS index lives in one session's memory; there is nothing to build ahead of time
+        raise ValueError("Invalid vectorstore type for bulk ingest. Choose 'chroma' or 'numpy'")
+    checkpoint = checkpoint or Checkpoint()
+    embeddings = cached_embeddings()
+    started = time.perf_counter()
+    totals = {"done": 0, "failed": 0, "skipped": 0, "pages": 0}
+
+    def report():
+        hours = max(time.perf_counter() - started, 1e-9) / 3600
+        print(f"[bulk-ingest] done={totals['done']} failed={totals['failed']} skipped={totals['skipped']} "
+              f"docs/hour={totals['done'] / hours:.1f} pages/hour={totals['pages'] / hours:.1f}", flush=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def drain(block_until):
+            # Keep the number of submitted documents bounded instead of queueing the whole library
+            while len(in_flight) > block_until:
+                future = next(as_completed(in_flight))
+                document = in_flight.pop(future)
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    totals["failed"] += 1
+                    checkpoint.record(document, "failed", error=f"{type(e).__name__}: {e}")
+                    print(f"[bulk-ingest] failed {document.source_id}: {e}", file=sys.stderr, flush=True)
+                else:
+                    totals["done"] += 1
+                    totals["pages"] += stats["pages"]
+                    checkpoint.record(document, "done", **stats)
+                if (totals["done"] + totals["failed"]) % report_every == 0:
+                    report()
+
+        for document in documents:
+            if checkpoint.is_done(document):
+                totals["skipped"] += 1
+                continue
+            in_flight[executor.submit(ingest_one, document, extractor, embeddings, summary_backend, vectorstore_type)] = document
+            drain(block_until=workers * 2)
+
+        drain(block_until=0)
+
+    report()
+    return {**totals, "seconds": time.perf_counter() - started}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory or S3 prefix of PDF filings")
+    parser.add_argument("source", help="Local directory or s3://bucket/prefix")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed at the same time")
+    parser.add_argument("--extractor", default=None, help="Extraction backend: unstructured, pdfplumber or pymupdf")
+    parser.add_argument("--summarizer", default=None, choices=["llm", "extractive"],
+                        help="Summary backend; extractive runs offline and costs no LLM calls")
+    parser.add_argument("--vectorstore", default="chroma", choices=["chroma", "numpy"],
+                        help="Dense index built for each document, as chosen in the chat app")
+    parser.add_argument("--checkpoint", default=BULK_INGEST_CHECKPOINT, help="Checkpoint file used to resume")
+    parser.add_argument("--report-every", type=int, default=10, help="Print throughput every N documents")
+    args = parser.parse_args()
+
+    summary = run_bulk_ingest(
+        iter_documents(args.source),
+        workers=args.workers,
+        checkpoint=Checkpoint(args.checkpoint),
+        extractor=args.extractor,
+        report_every=args.report_every,
+        summary_backend=args.summarizer,
+        vectorstore_type=args.vectorstore
+    )
+    if summary["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from contextlib import contextmanager
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv())
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "./processed_pdf/cache")
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "1024"))
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "./processed_pdf/summaries.sqlite")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./processed_pdf/embeddings.sqlite")
+
+class ExtractionCache:
+    """
+    On-disk cache of parsed Unstructured elements, keyed by the hash of the file bytes
+    and the extractor settings. Entries are stored in the same JSON layout as the
+    processed_pdf/*.pdf.json files and evicted least recently used once the
+    directory grows past max_mb.
+    """
+
+    def __init__(self, cache_dir=EXTRACTION_CACHE_DIR, max_mb=EXTRACTION_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_bytes, settings=None):
+        """Hash the file content together with the settings that shaped the extraction."""
+        digest = hashlib.sha256(file_bytes)
+        digest.update(json.dumps(settings or {}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf.json")
+
+    def lookup(self, key):
+        """Return the path of the cached entry for key, or None on a miss."""
+        path = self._path(key)
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def get(self, key):
+        """Return the cached element list for key, or None on a miss."""
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, elements):
+        """Store the element list under key and evict old entries if over the size cap."""
+        with self.writer(key) as f:
+            f.write(json.dumps(elements).encode("utf-8"))
+
+    @contextmanager
+    def writer(self, key):
+        """
+        Open a binary file to stream an entry into. The entry only becomes visible
+        once the block exits cleanly; on error the partial file is discarded.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        f = open(tmp_path, "wb")
+        try:
+            yield f
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+        f.close()
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".pdf.json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+extraction_cache = ExtractionCache()
+
+class SummaryCache:
+    """
+    SQLite cache of LLM summaries keyed by the hash of the element content, the prompt
+    version and text, and the model name. A new prompt version or model produces new keys,
+    so stale summaries are never served; prune() removes the entries of older versions.
+    The database is opened on first use and shared by all threads.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content, prompt, model, prompt_version):
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, prompt, content):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, summary TEXT NOT NULL, prompt_version TEXT, model TEXT, created REAL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys):
+        """Return {key: summary} for the keys that are cached."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            conn = self._connect()
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, summary FROM summaries WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, items, prompt_version=None, model=None):
+        """Store (key, summary) pairs."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO summaries (key, summary, prompt_version, model, created) VALUES (?, ?, ?, ?, ?)",
+                    [(key, summary, prompt_version, model, now) for key, summary in items]
+                )
+
+    def prune(self, prompt_version):
+        """Delete summaries written with any other prompt version; returns the number removed."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute("DELETE FROM summaries WHERE prompt_version IS NOT ?", (prompt_version,)).rowcount
+
+summary_cache = SummaryCache()
+
+
+class EmbeddingCache:
+    """
+    SQLite byte store of embedding vectors keyed by the hash of the model name and the
+    text. Vectors are stored as raw float32 bytes. The database is opened on first use and
+    shared by all threads.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys):
+        """Return {key: float32 vector} for the keys that are cached."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs."""
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,263 @@
+import os
+import json
+import queue
+import random
+import asyncio
+import threading
+import aiohttp
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv())
+
+UNSTRUCTURED_API_URL = os.getenv("UNSTRUCTURED_API_URL")
+UNSTRUCTURED_API_KEY = os.getenv("UNSTRUCTURED_API_KEY")
+
+UNSTRUCTURED_TIMEOUT = float(os.getenv("UNSTRUCTURED_TIMEOUT", "300"))
+UNSTRUCTURED_MAX_CONCURRENCY = int(os.getenv("UNSTRUCTURED_MAX_CONCURRENCY", "8"))
+UNSTRUCTURED_MAX_RETRIES = int(os.getenv("UNSTRUCTURED_MAX_RETRIES", "5"))
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Marks the end of a streamed response body
+_END = object()
+
+class ExtractionError(Exception):
+    """Raised when the partition endpoint cannot return elements for a document."""
+
+class PartitionClient:
+    """
+    Client for the Unstructured partition endpoint.
+
+    All requests run on one background event loop that owns a single keep-alive
+    connection pool, so sync callers, worker threads and other event loops share
+    the same connections. Concurrency is bounded by max_concurrency, each attempt
+    has its own timeout, and 429/5xx responses and connection errors are retried
+    with jittered exponential backoff.
+    """
+
+    def __init__(self,
+                 url=UNSTRUCTURED_API_URL,
+                 api_key=UNSTRUCTURED_API_KEY,
+                 max_concurrency=UNSTRUCTURED_MAX_CONCURRENCY,
+                 max_retries=UNSTRUCTURED_MAX_RETRIES,
+                 timeout=UNSTRUCTURED_TIMEOUT,
+                 backoff_base=1.0,
+                 backoff_max=30.0):
+        self.url = url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    # Event loop and connection pool
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="partition-client",
+                    daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "Accept": "application/json",
+                    "unstructured-api-key": self.api_key or ""
+                }
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    # Request logic, always executed on the client's own loop
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter keeps retries from many chunks from arriving in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _form(self, file_bytes, fields):
+        form = aiohttp.FormData()
+        form.add_field("files", file_bytes, filename="document", content_type="application/pdf")
+        for name, value in (fields or {}).items():
+            form.add_field(name, str(value))
+        return form
+
+    async def _post(self, file_bytes, fields, consume):
+        """
+        POST a document, retrying on transient failures, and await consume(response)
+        on the first 200 response while still holding a concurrency slot.
+        """
+        session = await self._get_session()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                try:
+                    async with session.post(self.url, data=self._form(file_bytes, fields), timeout=timeout) as response:
+                        if response.status == 200:
+                            return await consume(response)
+
+                        text = await response.text()
+                        if response.status not in RETRY_STATUSES:
+                            raise ExtractionError(f"API returned {response.status}: {text[:200]}")
+
+                        retry_after = response.headers.get("Retry-After")
+                        last_error = f"API returned {response.status}: {text[:200]}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    last_error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        raise ExtractionError(f"API request failed after {self.max_retries + 1} attempts: {last_error}")
+
+    async def _partition(self, file_bytes, fields):
+        async def read_json(response):
+            body = await response.read()
+            try:
+                return json.loads(body)
+            except ValueError:
+                raise ExtractionError(f"Response is not valid JSON: {body[:200]!r}")
+
+        return await self._post(file_bytes, fields, read_json)
+
+    async def _stream(self, file_bytes, fields, sink):
+        async def forward_chunks(response):
+            # Part of the body has already been handed out, so a broken stream
+            # cannot be retried transparently
+            try:
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    sink(chunk)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise ExtractionError(f"Response stream broke: {type(e).__name__}: {e}")
+
+        await self._post(file_bytes, fields, forward_chunks)
+
+    async def _partition_many(self, requests):
+        return await asyncio.gather(*[
+            self._partition(file_bytes, fields) for file_bytes, fields in requests
+        ])
+
+    # Async entry points
+
+    async def apartition(self, file_bytes, **fields):
+        """Partition one document and return its element list."""
+        return await asyncio.wrap_future(self._submit(self._partition(file_bytes, fields)))
+
+    async def apartition_many(self, requests):
+        """
+        Partition several (file_bytes, fields) requests concurrently.
+        Results are returned in request order.
+        """
+        return await asyncio.wrap_future(self._submit(self._partition_many(requests)))
+
+    async def astream(self, file_bytes, **fields):
+        """Partition one document and yield the raw response body in chunks as it arrives."""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def put(item):
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+
+        future = self._submit(self._stream(file_bytes, fields, put))
+        future.add_done_callback(lambda _: put(_END))
+        try:
+            while (chunk := await chunks.get()) is not _END:
+                yield chunk
+            future.result()
+        finally:
+            future.cancel()
+
+    # Sync entry points
+
+    def partition(self, file_bytes, **fields):
+        """Blocking version of apartition."""
+        return self._submit(self._partition(file_bytes, fields)).result()
+
+    def partition_many(self, requests):
+        """Blocking version of apartition_many."""
+        return self._submit(self._partition_many(requests)).result()
+
+    def stream(self, file_bytes, **fields):
+        """Blocking version of astream."""
+        response = self._start_stream(file_bytes, fields)
+        try:
+            yield from response
+        finally:
+            response.close()
+
+    def stream_many(self, requests):
+        """
+        Start several (file_bytes, fields) requests at once and return a StreamedResponse per
+        request, in request order, each iterating its body chunks as they arrive. Bodies that
+        arrive before they are read wait in memory; close a response to cancel its request.
+        """
+        return [self._start_stream(file_bytes, fields) for file_bytes, fields in requests]
+
+    def _start_stream(self, file_bytes, fields):
+        chunks = queue.Queue()
+        future = self._submit(self._stream(file_bytes, fields, chunks.put))
+        future.add_done_callback(lambda _: chunks.put(_END))
+        return StreamedResponse(future, chunks)
+
+    def close(self):
+        """Close the connection pool and stop the background loop."""
+        if self._loop is None:
+            return
+        if self._session is not None:
+            self._submit(self._session.close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+        self._session = None
+
+class StreamedResponse:
+    """Body chunks of a request already sent by PartitionClient.stream_many."""
+
+    def __init__(self, future, chunks):
+        self._future = future
+        self._chunks = chunks
+
+    def __iter__(self):
+        while (chunk := self._chunks.get()) is not _END:
+            yield chunk
+        # Raises the ExtractionError of a failed request once its chunks are used up
+        self._future.result()
+
+    def close(self):
+        self._future.cancel()
+
+partition_client = PartitionClient()
@@ -0,0 +1,151 @@
+import re
+import hashlib
+import numpy as np
+from FinChatbot.pipeline.summarizer import SUMMARY_PROMPT, estimate_tokens
+
+# MinHash signature length and LSH banding (NUM_PERM / LSH_BANDS rows per band)
+NUM_PERM = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+NEAR_DUPLICATE_THRESHOLD = 0.85
+
+# Elements this short may be headers, footers and page numbers; the page numbers in them
+# are masked so "Page 3 of 40" and "Page 4 of 40" count as the same element. Other figures
+# are kept: "Revenue grew 3%" and "Revenue grew 12%" are different facts
+SHORT_ELEMENT_WORDS = 12
+
+WORD_PATTERN = re.compile(r"\w+")
+DIGIT_PATTERN = re.compile(r"\d+")
+# "Page 3", "Page 3 of 40", "3/40" after "page", a lone "- 3 -", or "3 | Annual Report" / "Annual Report | 3"
+PAGE_MARKER_PATTERN = re.compile(
+    r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?|^\W*\d{1,4}\W*$|^\s*\d{1,4}\s*\||\|\s*\d{1,4}\s*$",
+    re.IGNORECASE
+)
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240101)
+_PERM_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+def normalize_words(text, mask_page_numbers=True):
+    """Lowercased words of a text; in short elements, page numbers are masked to "0"."""
+    text = text.lower()
+    words = WORD_PATTERN.findall(text)
+    if mask_page_numbers and len(words) <= SHORT_ELEMENT_WORDS:
+        words = WORD_PATTERN.findall(PAGE_MARKER_PATTERN.sub(lambda m: DIGIT_PATTERN.sub("0", m.group()), text))
+    return words
+
+def shingles(words, size=SHINGLE_SIZE):
+    """Set of overlapping word n-grams."""
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM uint64 values) of a set of shingles."""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") % _PRIME
+         for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set)
+    )
+    # (a * x + b) mod p stays below 2**62, so uint64 does not overflow
+    return ((hashes[:, None] * _PERM_A + _PERM_B) % _PRIME).min(axis=0)
+
+class DedupeReport:
+    """What the dedupe stage removed from one document."""
+
+    def __init__(self):
+        self.elements = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.tokens_saved = 0
+
+    @property
+    def dropped(self):
+        return self.exact_duplicates + self.near_duplicates
+
+    def __str__(self):
+        return (f"dedupe: dropped {self.dropped}/{self.elements} elements "
+                f"({self.exact_duplicates} exact, {self.near_duplicates} near), ~{self.tokens_saved} tokens saved")
+
+class Deduplicator:
+    """
+    Drops exact and near-duplicate elements (repeated headers, footers, safe-harbor
+    paragraphs) so each distinct element is summarized and embedded once; the first
+    occurrence is kept.
+
+    Exact duplicates are found by hashing the normalized words. Longer texts are also
+    compared by MinHash over word shingles, with LSH banding so only elements sharing a band
+    are compared. Tables are only deduplicated exactly, since two tables differing in a few
+    figures are different tables.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, prompt_tokens=None):
+        self.threshold = threshold
+        self.prompt_tokens = estimate_tokens(SUMMARY_PROMPT) if prompt_tokens is None else prompt_tokens
+        self.report = DedupeReport()
+        self._hashes = set()
+        self._signatures = []
+        # Figures of each signature's element; a near match must report the same ones
+        self._figures = []
+        self._buckets = {}
+        self._rows = NUM_PERM // LSH_BANDS
+
+    def _band_keys(self, signature):
+        for band in range(LSH_BANDS):
+            yield band, signature[band * self._rows:(band + 1) * self._rows].tobytes()
+
+    def _classify(self, element, register):
+        # Every figure in a table counts
+        words = normalize_words(element.content, mask_page_numbers=element.kind != "table")
+        exact_key = hashlib.sha1(f"{element.kind}\0{' '.join(words)}".encode("utf-8")).digest()
+        if exact_key in self._hashes:
+            return "exact"
+
+        signature = None
+        if element.kind != "table" and len(words) > SHORT_ELEMENT_WORDS:
+            signature = minhash(shingles(words))
+            # The same paragraph with other numbers ("$4,210 million" vs "$3,874 million") is a different fact
+            figures = tuple(word for word in words if DIGIT_PATTERN.search(word))
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            for index in candidates:
+                if self._figures[index] == figures and np.mean(self._signatures[index] == signature) >= self.threshold:
+                    return "near"
+
+        if register:
+            self._hashes.add(exact_key)
+            if signature is not None:
+                index = len(self._signatures)
+                self._signatures.append(signature)
+                self._figures.append(figures)
+                for band_key in self._band_keys(signature):
+                    self._buckets.setdefault(band_key, []).append(index)
+        return None
+
+    def add_known(self, element):
+        """Register an element that is already kept (e.g. from a reused page) without counting it."""
+        self._classify(element, register=True)
+
+    def check(self, element):
+        """Return "exact" or "near" if the element duplicates one seen before, else None and remember it."""
+        self.report.elements += 1
+        duplicate = self._classify(element, register=True)
+        if duplicate == "exact":
+            self.report.exact_duplicates += 1
+        elif duplicate == "near":
+            self.report.near_duplicates += 1
+        if duplicate:
+            self.report.tokens_saved += estimate_tokens(element.content) + self.prompt_tokens
+        return duplicate
+
+def dedupe_elements(tables, texts, deduplicator=None):
+    """
+    Remove duplicate elements from table and text lists, keeping document order.
+    Returns (tables, texts, report).
+    """
+    deduplicator = deduplicator or Deduplicator()
+    tables = [element for element in tables if deduplicator.check(element) is None]
+    texts = [element for element in texts if deduplicator.check(element) is None]
+    return tables, texts, deduplicator.report
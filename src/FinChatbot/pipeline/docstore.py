@@ -0,0 +1,130 @@
+import os
+import json
+import sqlite3
+import threading
+from dotenv import load_dotenv, find_dotenv
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+
+load_dotenv(find_dotenv())
+
+DOCSTORE_PATH = os.getenv("DOCSTORE_PATH", "./processed_pdf/docstore.sqlite")
+
+# Stay under SQLite's bound parameter limit
+_BATCH = 500
+
+def _dumps(value):
+    if isinstance(value, Document):
+        return json.dumps({"page_content": value.page_content, "metadata": value.metadata})
+    return json.dumps({"value": value})
+
+def _loads(data):
+    data = json.loads(data)
+    if "page_content" in data:
+        return Document(page_content=data["page_content"], metadata=data["metadata"])
+    return data["value"]
+
+def list_namespaces(path=DOCSTORE_PATH):
+    """(namespace, entry count) of every namespace in a docstore file."""
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT namespace, COUNT(*) FROM docstore GROUP BY namespace ORDER BY namespace").fetchall()
+    except sqlite3.OperationalError:
+        # File created but the table not yet
+        return []
+    finally:
+        conn.close()
+
+class SQLiteDocStore(BaseStore):
+    """
+    Persistent docstore for the MultiVectorRetriever, a drop-in for InMemoryStore.
+
+    Parent documents live in one SQLite file and are scoped by namespace (the document key),
+    so every document sees only its own entries and reopening a filing does not re-run the
+    pipeline. The connection is opened on first use and shared by all threads; values are
+    Documents or JSON-serializable values.
+    """
+
+    def __init__(self, namespace, path=DOCSTORE_PATH):
+        self.namespace = namespace
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docstore ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def mget(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(keys), _BATCH):
+                batch = keys[start:start + _BATCH]
+                rows = conn.execute(
+                    f"SELECT key, value FROM docstore WHERE namespace = ? AND key IN ({','.join('?' * len(batch))})",
+                    [self.namespace, *batch]
+                ).fetchall()
+                found.update(rows)
+        return [_loads(found[key]) if key in found else None for key in keys]
+
+    def mset(self, key_value_pairs):
+        rows = [(self.namespace, key, _dumps(value)) for key, value in key_value_pairs]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO docstore (namespace, key, value) VALUES (?, ?, ?)", rows)
+
+    def mdelete(self, keys):
+        keys = list(keys)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for start in range(0, len(keys), _BATCH):
+                    batch = keys[start:start + _BATCH]
+                    conn.execute(
+                        f"DELETE FROM docstore WHERE namespace = ? AND key IN ({','.join('?' * len(batch))})",
+                        [self.namespace, *batch]
+                    )
+
+    def yield_keys(self, prefix=None):
+        with self._lock:
+            conn = self._connect()
+            if prefix:
+                # Escape LIKE wildcards so the prefix matches literally
+                escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                rows = conn.execute(
+                    "SELECT key FROM docstore WHERE namespace = ? AND key LIKE ? ESCAPE '\\'",
+                    (self.namespace, f"{escaped}%")
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT key FROM docstore WHERE namespace = ?", (self.namespace,)).fetchall()
+        for (key,) in rows:
+            yield key
+
+    def clear(self):
+        """Delete every entry of this namespace."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM docstore WHERE namespace = ?", (self.namespace,))
+
+    def count(self):
+        """Number of entries in this namespace."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM docstore WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
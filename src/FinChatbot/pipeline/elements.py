@@ -0,0 +1,169 @@
+import json
+import codecs
+
+TEXT_TYPES = ("NarrativeText", "UncategorizedText")
+READ_CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+class Element:
+    """
+    A typed table or text element extracted from a document, with the metadata needed
+    for page filtering, deduplication and citations. Slotted to keep large documents compact.
+    """
+    __slots__ = ("kind", "content", "page_number", "element_id", "parent_id", "coordinates", "table")
+
+    def __init__(self, kind, content, page_number=None, element_id=None, parent_id=None, coordinates=None, table=None):
+        self.kind = kind
+        self.content = content
+        self.page_number = page_number
+        self.element_id = element_id
+        self.parent_id = parent_id
+        self.coordinates = coordinates
+        # NormalizedTable for table elements, filled in at ingest
+        self.table = table
+
+    def __str__(self):
+        return self.content
+
+    def __repr__(self):
+        return f"Element(kind={self.kind!r}, page_number={self.page_number!r}, content={self.content[:40]!r})"
+
+    def metadata(self):
+        """Scalar metadata for vectorstore and docstore entries; unset fields are left out."""
+        metadata = {"kind": self.kind}
+        for name in ("page_number", "element_id", "parent_id"):
+            value = getattr(self, name)
+            if value is not None:
+                metadata[name] = value
+        return metadata
+
+class ElementParser:
+    """
+    Incremental parser for the top-level JSON array returned by the Unstructured API.
+    Feed it byte chunks as they arrive and it returns every element that is complete so far,
+    so only the unparsed tail of the stream is ever held in memory.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk):
+        """Consume a chunk of bytes and return the list of newly completed elements."""
+        text = self._utf8.decode(chunk)
+        if self._finished or not text:
+            return []
+
+        # Nothing can complete until a closing brace or bracket shows up
+        retry = "}" in text or "]" in text or not self._started
+        self._buffer += text
+        return self._drain() if retry else []
+
+    def close(self):
+        """Signal the end of the stream; raises ValueError if the array is incomplete."""
+        self._buffer += self._utf8.decode(b"", final=True)
+        elements = self._drain()
+        if not self._finished:
+            raise ValueError("Truncated element stream")
+        return elements
+
+    def _drain(self):
+        buffer = self._buffer
+        size = len(buffer)
+        pos = 0
+        elements = []
+
+        while True:
+            while pos < size and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= size:
+                break
+
+            char = buffer[pos]
+            if not self._started:
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                self._started = True
+                pos += 1
+                continue
+            if char == ",":
+                pos += 1
+                continue
+            if char == "]":
+                self._finished = True
+                pos += 1
+                break
+
+            try:
+                element, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # The element is not complete yet
+            elements.append(element)
+            pos = end
+
+        self._buffer = buffer[pos:]
+        return elements
+
+def iter_elements(chunks):
+    """Yield raw element dicts from an iterable of byte chunks as soon as each one is complete."""
+    parser = ElementParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+async def aiter_elements(chunks):
+    """Async version of iter_elements for an async iterable of byte chunks."""
+    parser = ElementParser()
+    async for chunk in chunks:
+        for element in parser.feed(chunk):
+            yield element
+    for element in parser.close():
+        yield element
+
+def iter_elements_from_file(path, chunk_size=READ_CHUNK_SIZE):
+    """Stream raw element dicts out of a processed_pdf/*.pdf.json file."""
+    with open(path, "rb") as f:
+        yield from iter_elements(iter(lambda: f.read(chunk_size), b""))
+
+def _coordinates(metadata):
+    points = (metadata.get("coordinates") or {}).get("points")
+    if not points:
+        return None
+    return tuple((float(x), float(y)) for x, y in points)
+
+def to_element(element):
+    """Convert a raw element dict into a typed Element, or None if it is not a table or text."""
+    if not isinstance(element, dict):
+        print("Unexpected element format:", element)
+        return None
+
+    element_type = element.get("type")
+    if element_type == "Table":
+        kind = "table"
+        content = element["metadata"]["text_as_html"]
+    elif element_type in TEXT_TYPES:
+        kind = "text"
+        content = element["text"]
+    else:
+        return None
+
+    metadata = element.get("metadata") or {}
+    return Element(
+        kind,
+        content,
+        page_number=metadata.get("page_number"),
+        element_id=element.get("element_id"),
+        parent_id=metadata.get("parent_id"),
+        coordinates=_coordinates(metadata)
+    )
+
+def typed_elements(elements):
+    """Yield typed Elements for the table and text entries of a raw element stream."""
+    for element in elements:
+        typed = to_element(element)
+        if typed is not None:
+            yield typed
@@ -0,0 +1,79 @@
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from dotenv import load_dotenv, find_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from FinChatbot.pipeline.cache import embedding_cache
+
+load_dotenv(find_dotenv())
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "512"))
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings backed by the persistent embedding cache.
+
+    Document vectors are looked up by model and text hash, and only the misses are sent
+    to the model, each distinct text once and in batches of batch_size. Query vectors are
+    kept in a small in-process LRU, since the same questions come back within a session.
+    """
+
+    def __init__(self, embeddings, model=None, cache=embedding_cache,
+                 batch_size=EMBEDDING_BATCH_SIZE, query_cache_size=EMBEDDING_QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, "model", type(embeddings).__name__)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.query_cache_size = query_cache_size
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        keys = [self.cache.make_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                misses.setdefault(key, text)
+
+        if misses:
+            items = list(misses.items())
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                embedded = self.embeddings.embed_documents([text for _, text in batch])
+                new_vectors = [(key, np.asarray(vector, dtype=np.float32)) for (key, _), vector in zip(batch, embedded)]
+                # Written per batch, so an interrupted bulk run keeps what it already paid for
+                self.cache.put_many(new_vectors)
+                vectors.update(new_vectors)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        with self._lock:
+            if text in self._queries:
+                self._queries.move_to_end(text)
+                return list(self._queries[text])
+
+        vector = self.embeddings.embed_query(text)
+
+        with self._lock:
+            self._queries[text] = vector
+            self._queries.move_to_end(text)
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+        return list(vector)
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def cached_embeddings(model=EMBEDDING_MODEL):
+    """Process-wide CachedEmbeddings over OpenAIEmbeddings for a model, so sessions share the query LRU."""
+    with _shared_lock:
+        if model not in _shared:
+            _shared[model] = CachedEmbeddings(OpenAIEmbeddings(model=model, chunk_size=EMBEDDING_BATCH_SIZE), model=model)
+        return _shared[model]
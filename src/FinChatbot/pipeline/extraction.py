@@ -1,50 +1,73 @@
-import requests
 import os
 from dotenv import load_dotenv, find_dotenv
+from FinChatbot.pipeline.cache import extraction_cache
+from FinChatbot.pipeline.client import partition_client
+from FinChatbot.pipeline.elements import (iter_elements,
+                                          iter_elements_from_file,
+                                          typed_elements)
 
 load_dotenv()
 
 UNSTRUCTURED_API_URL = os.getenv("UNSTRUCTURED_API_URL")
-UNSTRUCTURED_API_KEY = os.getenv("UNSTRUCTURED_API_KEY")
+
+# Settings that change what the API returns; part of the extraction cache key
+EXTRACTOR_SETTINGS = {
+    "extractor": "unstructured",
+    "url": UNSTRUCTURED_API_URL,
+}
+
+def split_elements(elements):
+    """
+    Split Unstructured elements into lists of table and narrative text Elements.
+    Accepts any iterable of raw element dicts, including a streamed one.
+    """
+    tables = []
+    texts = []
+
+    for element in typed_elements(elements):
+        if element.kind == "table":
+            tables.append(element)
+        else:
+            texts.append(element)
+
+    return tables, texts
+
+def _tee_to(f, chunks):
+    for chunk in chunks:
+        f.write(chunk)
+        yield chunk
+
+def iter_data(file_bytes):
+    """
+    Yield typed table and text Elements from a PDF as the Unstructured API response arrives,
+    so downstream stages can start before the download finishes. The raw response is
+    streamed into the extraction cache on the way through and replayed from disk next time.
+    """
+    cache_key = extraction_cache.make_key(file_bytes, EXTRACTOR_SETTINGS)
+    cached_path = extraction_cache.lookup(cache_key)
+    if cached_path is not None:
+        yield from typed_elements(iter_elements_from_file(cached_path))
+        return
+
+    with extraction_cache.writer(cache_key) as f:
+        chunks = _tee_to(f, partition_client.stream(file_bytes))
+        yield from typed_elements(iter_elements(chunks))
 
 def get_data(file_bytes):
     """
     Process a PDF file using the Unstructured API to extract tables and text content.
+    Returns two lists of Elements; tables carry their HTML as content, and every element keeps
+    its page number, element and parent ids and coordinates.
+    Parsed elements are cached on disk, so a file that was already processed is not re-posted.
+    Raises ExtractionError if the API cannot process the file after retries.
     """
-    headers = {
-        "Accept": "application/json",
-        "unstructured-api-key": UNSTRUCTURED_API_KEY
-    }
-
-    files = {
-        "files": ("document", file_bytes, "application/pdf")
-    }
-
-    try:
-        response = requests.post(UNSTRUCTURED_API_URL, headers=headers, files=files)
-        response.raise_for_status()  # Raise an error for non-200 status codes
-
-        try:
-            response_data = response.json()
-        except ValueError:
-            print("Error: Response is not valid JSON")
-            print("Raw response:", response.text)
-            return [], []
-
-        tables = []
-        texts = []
-
-        for element in response_data:
-            if isinstance(element, dict):  # Ensure the element is a dictionary
-                if element.get("type") == "Table":
-                    tables.append(element["metadata"]["text_as_html"])
-                elif element.get("type") in ["NarrativeText", "UncategorizedText"]:
-                    texts.append(element["text"])
-            else:
-                print("Unexpected element format:", element)
-
-        return tables, texts
-
-    except requests.exceptions.RequestException as e:
-        print("API Request failed:", str(e))
-        return [], []
+    tables = []
+    texts = []
+
+    for element in iter_data(file_bytes):
+        if element.kind == "table":
+            tables.append(element)
+        else:
+            texts.append(element)
+
+    return tables, texts
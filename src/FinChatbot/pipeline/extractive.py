@@ -0,0 +1,134 @@
+'''
+Offline extractive summaries, for runs without an OpenAI key or where LLM summaries are
+not worth the cost (CI, bulk backfills, benchmarks, draft ingests).
+
+Tables are summarized by their column headers and key rows; narrative text by TextRank
+over its sentences. Output is deterministic for a given input.
+'''
+
+import os
+import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from FinChatbot.pipeline.tables import NormalizedTable, _format_value, normalize_table
+
+EXTRACTIVE_WORKERS = int(os.getenv("EXTRACTIVE_WORKERS", str(os.cpu_count() or 1)))
+
+# Below this many elements the process pool costs more than it saves
+EXTRACTIVE_POOL_MIN_ELEMENTS = 64
+
+SUMMARY_SENTENCES = 3
+TABLE_KEY_ROWS = 6
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\"'])")
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9']+|\d[\d,.]*%?")
+STOPWORDS = frozenset(
+    "a an and are as at be been by for from has have in into is it its of on or that the "
+    "their this to was were which will with we our".split()
+)
+
+# Line items that usually carry the point of a financial table
+KEY_ROW_PATTERN = re.compile(
+    r"total|revenue|sales|net income|net loss|operating income|gross (profit|margin)|ebitda|"
+    r"earnings per share|\beps\b|cash|assets|liabilities|equity|debt",
+    re.IGNORECASE
+)
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.split(" ".join(text.split())) if sentence.strip()]
+
+def textrank(sentences, damping=0.85, iterations=50, tol=1e-6):
+    """TextRank scores of sentences from tf-idf cosine similarity, by power iteration."""
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in WORD_PATTERN.findall(sentence.lower()):
+            if word in STOPWORDS:
+                continue
+            rows.append(i)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    n = len(sentences)
+    if not vocabulary:
+        return np.full(n, 1.0 / max(n, 1))
+
+    counts = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows), np.array(cols)), 1.0)
+    idf = np.log((1 + n) / (1 + (counts > 0).sum(axis=0))) + 1.0
+    weights = np.log1p(counts) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    weights /= np.where(norms == 0, 1.0, norms)
+
+    similarity = weights @ weights.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # Sentences sharing no words with any other link to every sentence equally
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight == 0, 1.0, out_weight), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+def summarize_text(text, max_sentences=SUMMARY_SENTENCES):
+    """The highest ranked sentences of a text, in their original order."""
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+    scores = textrank(sentences)
+    # Stable sort keeps earlier sentences first among equal scores
+    top = np.sort(np.argsort(-scores, kind="stable")[:max_sentences])
+    return " ".join(sentences[i] for i in top)
+
+def summarize_table(table, max_rows=TABLE_KEY_ROWS):
+    """Column headers plus the key line items (totals, revenue, income, cash...) of a NormalizedTable."""
+    if not table.row_labels:
+        return "Table: " + ", ".join(table.columns)
+
+    has_values = ~np.isnan(table.values).all(axis=1) if table.values.size else np.zeros(len(table.row_labels), bool)
+    key_rows = [i for i, label in enumerate(table.row_labels) if has_values[i] and KEY_ROW_PATTERN.search(label)]
+    if len(key_rows) < max_rows:
+        # Fill up with the rows holding the largest figures
+        magnitude = np.nan_to_num(np.abs(table.values), nan=0.0).max(axis=1) if table.values.size else np.zeros(0)
+        for i in np.argsort(-magnitude, kind="stable"):
+            if has_values[i] and i not in key_rows:
+                key_rows.append(int(i))
+            if len(key_rows) >= max_rows:
+                break
+    key_rows = sorted(key_rows[:max_rows])
+
+    parts = [f"Table with columns: {', '.join(table.columns)}."]
+    if table.unit:
+        parts.append(f"Values converted from {table.unit}.")
+    for i in key_rows:
+        values = ", ".join(
+            f"{column} {_format_value(value, is_percent)}"
+            for column, value, is_percent in zip(table.columns, table.values[i], table.percent[i])
+            if not np.isnan(value)
+        )
+        parts.append(f"{table.row_labels[i]}: {values}.")
+    return " ".join(parts)
+
+def _summarize(item):
+    kind, content, table = item
+    if kind == "table":
+        table = NormalizedTable.from_dict(table) if table is not None else normalize_table(content)
+        return summarize_table(table)
+    return summarize_text(content)
+
+def extractive_summaries(elements, max_workers=EXTRACTIVE_WORKERS):
+    """Extractive summaries of Elements (or plain strings), in order, across a process pool."""
+    items = []
+    for element in elements:
+        kind = getattr(element, "kind", "text")
+        table = getattr(element, "table", None)
+        items.append((kind, str(element), table.to_dict() if table is not None else None))
+
+    if max_workers <= 1 or len(items) < EXTRACTIVE_POOL_MIN_ELEMENTS:
+        return [_summarize(item) for item in items]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_summarize, items, chunksize=max(1, len(items) // (max_workers * 4))))
@@ -0,0 +1,230 @@
+import io
+import os
+import re
+import html
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv, find_dotenv
+from pypdf import PdfReader
+from FinChatbot.pipeline.cache import extraction_cache
+from FinChatbot.pipeline.elements import typed_elements
+from FinChatbot.pipeline.pdfprocessing import iter_pdf_parallel, plan_page_ranges
+
+load_dotenv(find_dotenv())
+
+EXTRACTOR_BACKEND = os.getenv("EXTRACTOR_BACKEND", "unstructured")
+EXTRACTOR_WORKERS = int(os.getenv("EXTRACTOR_WORKERS", "0")) or os.cpu_count() or 1
+
+# Pages handed to a worker per task; small enough to balance uneven pages across the pool
+PAGES_PER_TASK = 8
+
+# Numeric-block heuristic: text blocks in a single font that contain figures are treated
+# as tables laid out with whitespace, split into columns on runs of two or more spaces
+NUMBER_PATTERN = re.compile(r'\$?\d+(?:\.\d+)?%?')
+COLUMN_GAP_PATTERN = re.compile(r'\s{2,}')
+
+def rows_to_html(rows):
+    """Render table rows as the same kind of HTML the Unstructured API returns in text_as_html."""
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(cell or '').strip())}</td>" for cell in row) + "</tr>"
+        for row in rows
+    )
+    return f"<table>{body}</table>"
+
+def table_record(rows, page_number):
+    """Unstructured-shaped Table element for a list of rows."""
+    return {
+        "type": "Table",
+        "text": "\n".join(" ".join(str(cell or "").strip() for cell in row) for row in rows),
+        "metadata": {"page_number": page_number, "text_as_html": rows_to_html(rows)}
+    }
+
+def text_record(text, page_number):
+    """Unstructured-shaped NarrativeText element."""
+    return {
+        "type": "NarrativeText",
+        "text": text,
+        "metadata": {"page_number": page_number}
+    }
+
+# Local backends. Each worker extracts a [start, end) page range of the document it was
+# initialised with and returns Unstructured-shaped element dicts, so every backend feeds
+# the same cache, parser and downstream stages.
+
+_worker_file_bytes = None
+
+def _init_worker(file_bytes):
+    global _worker_file_bytes
+    _worker_file_bytes = file_bytes
+
+def _container_fonts(container):
+    from pdfminer.layout import LTChar
+
+    fonts = set()
+    for child in container:
+        if isinstance(child, LTChar):
+            fonts.add(child.fontname)
+        elif hasattr(child, "__iter__"):
+            fonts.update(char.fontname for char in child if isinstance(char, LTChar))
+    return fonts
+
+def _numeric_blocks(layout):
+    """Rows of the single-font text blocks on a page that contain numbers."""
+    from pdfminer.layout import LTTextContainer
+
+    blocks = []
+    for element in layout:
+        if not isinstance(element, LTTextContainer) or len(_container_fonts(element)) != 1:
+            continue
+        lines = [line.strip() for line in element.get_text().split("\n") if line.strip()]
+        if len(lines) > 1 and any(NUMBER_PATTERN.search(line) for line in lines):
+            blocks.append([COLUMN_GAP_PATTERN.split(line) for line in lines])
+    return blocks
+
+def _financial_pages(page_range, file_bytes=None, numeric_blocks=True):
+    """
+    Single pass over a page range with pdfplumber. With numeric_blocks, the pdfminer layout
+    is analysed once per page (laparams groups it into text boxes) and shared by the text,
+    table and numeric-block heuristics; without, that analysis is skipped. Returns one dict
+    per page with its timing.
+    """
+    import pdfplumber
+
+    start, end = page_range
+    pages = []
+    pdf_bytes = file_bytes if file_bytes is not None else _worker_file_bytes
+    # Layout analysis is only needed to group characters into the text boxes numeric blocks come from
+    laparams = {} if numeric_blocks else None
+    with pdfplumber.open(io.BytesIO(pdf_bytes), pages=list(range(start + 1, end + 1)), laparams=laparams) as pdf:
+        for page in pdf.pages:
+            started = time.perf_counter()
+
+            layout = page.layout if numeric_blocks else None
+            text = (page.extract_text() or "").strip()
+            tables = [table for table in page.extract_tables() if table and len(table) > 1]
+
+            pages.append({
+                "page_number": page.page_number,
+                "text": text,
+                "tables": tables,
+                "numeric_blocks": _numeric_blocks(layout) if numeric_blocks else [],
+                "seconds": time.perf_counter() - started
+            })
+            page.close()
+    return pages
+
+def _pdfplumber_pages(page_range, file_bytes=None):
+    elements = []
+    for page in _financial_pages(page_range, file_bytes, numeric_blocks=False):
+        if page["text"]:
+            elements.append(text_record(page["text"], page["page_number"]))
+        for table in page["tables"]:
+            elements.append(table_record(table, page["page_number"]))
+    return elements
+
+def _pymupdf_pages(page_range, file_bytes=None):
+    import pymupdf
+
+    start, end = page_range
+    elements = []
+    pdf_bytes = file_bytes if file_bytes is not None else _worker_file_bytes
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for number in range(start, end):
+            page = doc[number]
+            page_number = number + 1
+
+            table_boxes = []
+            for table in page.find_tables().tables:
+                rows = table.extract()
+                if rows and len(rows) > 1:
+                    elements.append(table_record(rows, page_number))
+                    table_boxes.append(pymupdf.Rect(table.bbox))
+
+            # Text blocks, skipping the ones that were already captured as table cells
+            for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+                if block_type != 0 or not text.strip():
+                    continue
+                block = pymupdf.Rect(x0, y0, x1, y1)
+                if any(box.intersects(block) for box in table_boxes):
+                    continue
+                elements.append(text_record(text.strip(), page_number))
+    return elements
+
+LOCAL_BACKENDS = {
+    "pdfplumber": _pdfplumber_pages,
+    "pymupdf": _pymupdf_pages,
+}
+
+def _extract_local(worker, file_bytes, max_workers):
+    num_pages = len(PdfReader(io.BytesIO(file_bytes)).pages)
+    num_tasks = max(1, -(-num_pages // PAGES_PER_TASK))
+    page_ranges = plan_page_ranges([1] * num_pages, num_tasks)
+
+    if max_workers <= 1 or len(page_ranges) == 1:
+        results = [worker(page_range, file_bytes) for page_range in page_ranges]
+    else:
+        # The document is shipped to each worker process once, not once per task
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(page_ranges)),
+                                 initializer=_init_worker,
+                                 initargs=(file_bytes,)) as executor:
+            results = list(executor.map(worker, page_ranges))
+
+    # executor.map keeps submission order, so pages come back in order
+    return [element for result in results for element in result]
+
+def _assign_element_ids(elements):
+    """Give local elements stable ids in the same spirit as Unstructured's: page, position and text."""
+    for index, element in enumerate(elements):
+        key = f"{element['metadata'].get('page_number')}:{index}:{element['text']}"
+        element["element_id"] = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return elements
+
+def extract_financial_pages(file_bytes, max_workers=None):
+    """
+    Run the single-pass pdfplumber page worker across a process pool and return one dict
+    per page, in page order, with its text, visual tables, numeric blocks and timing.
+    """
+    return _extract_local(_financial_pages, file_bytes, max_workers or EXTRACTOR_WORKERS)
+
+def iter_raw_elements(file_bytes, backend=None, max_workers=None):
+    """
+    Yield Unstructured-shaped element dicts for a PDF from the selected backend.
+    Backends: 'unstructured' (remote API), 'pdfplumber' and 'pymupdf' (local, page-parallel
+    across a process pool). Results of every backend are kept in the extraction cache.
+    """
+    backend = (backend or EXTRACTOR_BACKEND).lower()
+    if backend == "unstructured":
+        yield from iter_pdf_parallel(file_bytes)
+        return
+
+    if backend not in LOCAL_BACKENDS:
+        raise ValueError(f"Invalid extractor backend. Choose one of: unstructured, {', '.join(LOCAL_BACKENDS)}")
+
+    cache_key = extraction_cache.make_key(file_bytes, {"extractor": backend})
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        yield from cached
+        return
+
+    elements = _extract_local(LOCAL_BACKENDS[backend], file_bytes, max_workers or EXTRACTOR_WORKERS)
+    _assign_element_ids(elements)
+    extraction_cache.put(cache_key, elements)
+    yield from elements
+
+def extract_elements(file_bytes, backend=None, max_workers=None):
+    """Extract a PDF into a list of typed table and text Elements with the selected backend."""
+    return list(typed_elements(iter_raw_elements(file_bytes, backend, max_workers)))
+
+def extract_data(file_bytes, backend=None, max_workers=None):
+    """Same contract as get_data (tables, texts) for any extractor backend."""
+    tables = []
+    texts = []
+
+    for element in extract_elements(file_bytes, backend, max_workers):
+        if element.kind == "table":
+            tables.append(element)
+        else:
+            texts.append(element)
+
+    return tables, texts
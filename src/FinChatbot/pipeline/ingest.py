@@ -0,0 +1,271 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv, find_dotenv
+from FinChatbot.pipeline.dedupe import Deduplicator
+from FinChatbot.pipeline.elements import to_element
+from FinChatbot.pipeline.extractors import iter_raw_elements
+from FinChatbot.pipeline.pdfprocessing import page_hashes, select_pages
+from FinChatbot.pipeline.summarizer import SummaryReport, get_summary
+from FinChatbot.pipeline.tables import NormalizedTable, normalize_table
+
+load_dotenv(find_dotenv())
+
+INGEST_MANIFEST_DIR = os.getenv("INGEST_MANIFEST_DIR", "./processed_pdf/manifests")
+
+# Pages extracted and summarized together when a document is indexed progressively
+INGEST_BATCH_PAGES = int(os.getenv("INGEST_BATCH_PAGES", "10"))
+# Batches extracted at once, ahead of the one being summarized; each extraction is itself
+# parallel across pages, so a few are enough to keep the extractor busy
+INGEST_PREFETCH_BATCHES = int(os.getenv("INGEST_PREFETCH_BATCHES", "2"))
+
+# Element metadata kept in the manifest; the rest of the Unstructured metadata is dropped
+MANIFEST_METADATA_KEYS = ("page_number", "parent_id", "text_as_html", "coordinates")
+
+def content_hash(content):
+    """sha256 hex digest of a str or bytes value."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+def revision_key(owner, name):
+    """
+    Manifest key shared by the revisions of one filing: the uploading user (or other filer id)
+    and the file name, so unrelated filings that only share a name keep separate manifests.
+    """
+    return f"{owner}/{name}"
+
+def _compact(raw, page_number):
+    metadata = raw.get("metadata") or {}
+    compact = {key: raw[key] for key in ("type", "element_id", "text") if key in raw}
+    compact["metadata"] = {key: metadata[key] for key in MANIFEST_METADATA_KEYS if key in metadata}
+    compact["metadata"]["page_number"] = page_number
+    return compact
+
+class PageManifest:
+    """
+    Per-document record of what was ingested, keyed by page content hash.
+
+    For every page it keeps the extracted elements, their summaries and, for tables,
+    the normalized numeric form. When an amended version of the same document is
+    ingested, pages whose hash is already known are reused as-is and only new
+    pages are extracted and summarized; their embeddings come from the embedding cache.
+    """
+
+    def __init__(self, doc_key, manifest_dir=INGEST_MANIFEST_DIR):
+        self.doc_key = doc_key
+        self.path = os.path.join(manifest_dir, f"{content_hash(doc_key)}.json")
+        self.pages = {}
+
+    @classmethod
+    def load(cls, doc_key, manifest_dir=INGEST_MANIFEST_DIR):
+        manifest = cls(doc_key, manifest_dir)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+
+        manifest.pages = data.get("pages", {})
+        return manifest
+
+    def save(self, current_hashes):
+        """Persist the entries of the current pages; pages dropped from the document are pruned."""
+        pages = {page_hash: self.pages[page_hash] for page_hash in current_hashes if page_hash in self.pages}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Per thread too: two sessions or bulk workers may save the same key at once
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"doc_key": self.doc_key, "pages": pages}, f)
+        os.replace(tmp_path, self.path)
+
+class IngestResult:
+    """Elements and summaries of an ingested document, split into tables and texts."""
+
+    def __init__(self, page_hashes, changed_pages):
+        self.page_hashes = page_hashes
+        self.changed_pages = changed_pages
+        self.tables = []
+        self.texts = []
+        self.table_summaries = []
+        self.text_summaries = []
+        self.dedupe = None
+        self.summaries = None
+
+    @property
+    def reused_pages(self):
+        return len(self.page_hashes) - len(self.changed_pages)
+
+def _extract_changed_pages(file_bytes, changed_pages, extractor):
+    """Extract only the changed pages and map elements back to their page hash."""
+    sub_pdf = select_pages(file_bytes, changed_pages)
+
+    extracted = {}
+    previous_text = ""
+    for raw in iter_raw_elements(sub_pdf, backend=extractor):
+        element = to_element(raw)
+        if element is None:
+            previous_text = raw.get("text", "") if isinstance(raw, dict) else ""
+            continue
+        # Page numbers of the sub-document are 1..len(changed_pages)
+        sub_page = (element.page_number or 1) - 1
+        page_index = changed_pages[min(sub_page, len(changed_pages) - 1)]
+        entry = {"element": _compact(raw, page_index + 1), "summary": None}
+
+        # Tables are parsed into numbers once here; the text just before a table
+        # usually carries its "in millions" note
+        if element.kind == "table":
+            entry["table"] = normalize_table(element.content, previous_text).to_dict()
+
+        extracted.setdefault(page_index, []).append(entry)
+        previous_text = raw.get("text", "")
+    return extracted
+
+def _entry_element(entry):
+    """Element of a manifest entry, with its normalized table attached."""
+    element = to_element(entry["element"])
+    if entry.get("table") is not None:
+        element.table = NormalizedTable.from_dict(entry["table"])
+    return element
+
+def _collect(batch, page_entries):
+    """Add the elements and summaries of (page_index, entries) pairs to a result or batch."""
+    for page_index, entries in page_entries:
+        for entry in entries:
+            # A reused page may have moved, so its elements take the page number it has now
+            element = to_element(entry["element"])
+            element.page_number = page_index + 1
+            if element.kind == "table":
+                if "table" not in entry:
+                    entry["table"] = normalize_table(element.content).to_dict()
+                element.table = NormalizedTable.from_dict(entry["table"])
+                batch.tables.append(element)
+                batch.table_summaries.append(entry["summary"])
+            else:
+                batch.texts.append(element)
+                batch.text_summaries.append(entry["summary"])
+
+class IngestBatch:
+    """Elements and summaries that became ready together, with the document progress after them."""
+
+    def __init__(self, pages_done, pages_total):
+        self.pages_done = pages_done
+        self.pages_total = pages_total
+        self.tables = []
+        self.texts = []
+        self.table_summaries = []
+        self.text_summaries = []
+
+def plan_ingest(file_bytes, manifest):
+    """
+    Hash the pages of a document and find the ones the manifest does not know yet. A page
+    repeated in the document shares its hash, and so its manifest entry, with the first copy;
+    only that first copy is extracted.
+    """
+    hashes = page_hashes(file_bytes)
+    changed_pages, seen = [], set()
+    for i, page_hash in enumerate(hashes):
+        if page_hash not in manifest.pages and page_hash not in seen:
+            seen.add(page_hash)
+            changed_pages.append(i)
+    return IngestResult(hashes, changed_pages)
+
+def iter_ingest_batches(file_bytes, manifest, result, extractor=None, batch_pages=INGEST_BATCH_PAGES,
+                        summary_backend=None):
+    """
+    Ingest a planned document in batches, yielding an IngestBatch as each becomes ready:
+    first every reused page, then the changed pages batch_pages at a time, each extracted,
+    deduplicated and summarized on its own. All batches are queued for extraction up front
+    and run INGEST_PREFETCH_BATCHES at a time, so later pages are being extracted while earlier
+    ones are summarized; batches are still yielded in page order. The manifest is updated in place and the
+    dedupe and summary reports are kept on result. summary_backend picks the summarizer
+    ('llm' or 'extractive'), defaulting to SUMMARY_BACKEND.
+    """
+    hashes = result.page_hashes
+    new_hashes = {hashes[i] for i in result.changed_pages}
+    reused_pages = [i for i in range(len(hashes)) if hashes[i] not in new_hashes]
+
+    batch = IngestBatch(len(reused_pages), len(hashes))
+    _collect(batch, [(i, manifest.pages[hashes[i]]) for i in reused_pages])
+    yield batch
+    if not result.changed_pages:
+        return
+
+    # Repeated headers, footers and boilerplate are dropped before they are summarized;
+    # elements on reused pages count as already seen
+    deduplicator = Deduplicator()
+    for page_index in reused_pages:
+        for entry in manifest.pages[hashes[page_index]]:
+            deduplicator.add_known(to_element(entry["element"]))
+    result.dedupe = deduplicator.report
+    result.summaries = SummaryReport()
+
+    pages_done = len(reused_pages)
+    page_batches = [result.changed_pages[start:start + batch_pages]
+                    for start in range(0, len(result.changed_pages), batch_pages)]
+    executor = ThreadPoolExecutor(max_workers=max(1, INGEST_PREFETCH_BATCHES), thread_name_prefix="ingest-extract")
+    try:
+        futures = [executor.submit(_extract_changed_pages, file_bytes, pages, extractor) for pages in page_batches]
+        for pages, future in zip(page_batches, futures):
+            extracted = future.result()
+
+            for page_index in pages:
+                if page_index in extracted:
+                    extracted[page_index] = [
+                        entry for entry in extracted[page_index]
+                        if deduplicator.check(to_element(entry["element"])) is None
+                    ]
+
+            entries = [entry for page_index in pages for entry in extracted.get(page_index, [])]
+            new_tables = [entry for entry in entries if entry["element"]["type"] == "Table"]
+            new_texts = [entry for entry in entries if entry["element"]["type"] != "Table"]
+
+            if entries:
+                table_summaries, text_summaries = get_summary(
+                    [_entry_element(entry) for entry in new_tables],
+                    [_entry_element(entry) for entry in new_texts],
+                    report=result.summaries,
+                    backend=summary_backend
+                )
+                for entry, summary in zip(new_tables + new_texts, list(table_summaries) + list(text_summaries)):
+                    entry["summary"] = summary
+
+            for page_index in pages:
+                # Each hash is extracted once, by its first page, so no other page writes this slot
+                manifest.pages.setdefault(hashes[page_index], extracted.get(page_index, []))
+
+            # Later copies of these pages come with them, sharing their entries
+            batch_hashes = {hashes[i] for i in pages}
+            copies = [i for i in range(len(hashes)) if hashes[i] in batch_hashes]
+            pages_done += len(copies)
+            batch = IngestBatch(pages_done, len(hashes))
+            _collect(batch, [(i, manifest.pages[hashes[i]]) for i in copies])
+            yield batch
+    finally:
+        # A closed or failed ingest does not keep extracting pages nobody will read
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"[ingest] {manifest.doc_key}: {result.dedupe}")
+    print(f"[ingest] {manifest.doc_key}: {result.summaries}")
+
+def assemble_ingest(result, manifest):
+    """Fill result with the whole document in page order from the manifest."""
+    result.tables, result.texts, result.table_summaries, result.text_summaries = [], [], [], []
+    _collect(result, [(i, manifest.pages[page_hash]) for i, page_hash in enumerate(result.page_hashes)])
+    return result
+
+def ingest_document(file_bytes, manifest, extractor=None, summary_backend=None):
+    """
+    Extract and summarize a document, reusing every page already recorded in the manifest.
+    New pages are extracted as one sub-document, deduplicated, their elements summarized, and the
+    manifest updated in place; call manifest.save(result.page_hashes) once indexing is done.
+    """
+    result = plan_ingest(file_bytes, manifest)
+    for _ in iter_ingest_batches(file_bytes, manifest, result, extractor,
+                                 batch_pages=max(1, len(result.changed_pages)),
+                                 summary_backend=summary_backend):
+        pass
+    return assemble_ingest(result, manifest)
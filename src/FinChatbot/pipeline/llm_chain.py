@@ -1,49 +1,90 @@
 import os
+import threading
+import contextlib
 from dotenv import load_dotenv, find_dotenv
-from FinChatbot.pipeline.extraction import get_data
-from FinChatbot.pipeline.pdfprocessing import process_pdf_parallel
-from FinChatbot.pipeline.summarizer import get_summary
-from FinChatbot.pipeline.mvr import create_multi_vector_retriever
-from langchain_community.vectorstores import Chroma, FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from FinChatbot.pipeline.embeddings import cached_embeddings
+from FinChatbot.pipeline.ingest import (PageManifest,
+                                        content_hash,
+                                        iter_ingest_batches,
+                                        plan_ingest)
+from FinChatbot.pipeline.mvr import add_documents
+from FinChatbot.pipeline.tables import NormalizedTable
+from FinChatbot.pipeline.vectorstores import open_document_retriever, save_document_retriever
+from langchain_community.vectorstores import FAISS
+from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.documents import Document
 from langchain.memory import ConversationBufferMemory
 
 # Load environment variables
 load_dotenv(find_dotenv())
 
+def format_context(docs, normalized_tables=False):
+    """
+    Join retrieved elements into prompt context, labelled with their page for citations.
+    With normalized_tables, tables are given as their parsed numbers instead of raw HTML.
+    """
+    parts = []
+    for doc in docs:
+        if isinstance(doc, Document):
+            page = doc.metadata.get("page_number")
+            label = f"[Page {page}] " if page is not None else ""
+            content = doc.page_content
+            if normalized_tables and doc.metadata.get("table"):
+                content = NormalizedTable.from_dict(doc.metadata["table"]).to_text()
+            parts.append(f"{label}{content}")
+        else:
+            parts.append(str(doc))
+    return "\n\n".join(parts)
+
 class SpanLLM:
-    def __init__(self, pdf_file, vectorstore_type='chroma'):
+    def __init__(self, pdf_file, vectorstore_type='chroma', extractor=None, doc_key=None, background=True):
         """
-        Initialize with either 'chroma' or 'faiss' for vectorstore_type
+        Initialize with 'chroma', 'faiss' or 'numpy' for vectorstore_type. With 'chroma' the
+        document is indexed in its own persisted collection (see vectorstores), which every
+        later session opening the same document reuses; 'numpy' does the same with an exact
+        in-process index that is memory-mapped on reopen. Dense hits are fused with a sparse
+        index (BM25 or TF-IDF, SPARSE_BACKEND) over the same elements, persisted beside the collection.
+        extractor selects the extraction backend ('unstructured', 'pdfplumber' or 'pymupdf'),
+        defaulting to the EXTRACTOR_BACKEND environment variable.
+        doc_key identifies the filing across revisions, see ingest.revision_key; pages already
+        ingested under the same key are not extracted, summarized or embedded again. Without it
+        only an identical file is recognized, since a file name alone is not unique.
+        With background, the document is ingested on a worker thread and added to the index in
+        batches, so questions can be answered against the pages indexed so far; see progress.
         """
-        # Process PDF
+        # Process PDF, reusing unchanged pages of an earlier version of the same document
         file_bytes = pdf_file.getvalue()
-        tables, texts = get_data(file_bytes=file_bytes)
-        table_summaries, text_summaries = get_summary(tables, texts)
-
-        # Create vectorstore based on user choice
-        if vectorstore_type.lower() == 'chroma':
-            self.vectorstore = Chroma(
-                collection_name="rag-model",
-                embedding_function=OpenAIEmbeddings()
-            )
-        elif vectorstore_type.lower() == 'faiss':
-            self.vectorstore = FAISS.from_texts(
-                texts=[""],  # Initialize with empty text
-                embedding=OpenAIEmbeddings()
-            )
+        doc_key = doc_key or content_hash(file_bytes)
+        self.manifest = PageManifest.load(doc_key)
+        self.ingest = plan_ingest(file_bytes, self.manifest)
+        # Summaries and questions embedded before, in any session, are served from the cache
+        embeddings = cached_embeddings()
+        # Indexes are keyed by the file content: another filing that happens to share the
+        # name never sees, or prunes, this one's vectors
+        self.doc_hash = content_hash(file_bytes)
+
+        # Collection, sparse index and docstore entries of the file, the same ones bulk ingest builds
+        self.retriever = open_document_retriever(self.doc_hash, embeddings, vectorstore_type, doc_key=doc_key)
+        self.vectorstore = self.retriever.vectorstore
+        self.sparse_index = self.retriever.sparse_index
+        self.docstore = self.retriever.docstore
+
+        # Chroma, the NumPy index, the sparse index and the docstore can be searched while batches
+        # are added; an in-memory FAISS index cannot, so its adds and searches share a lock
+        self._index_lock = threading.Lock() if isinstance(self.vectorstore, FAISS) else contextlib.nullcontext()
+        self._ready = threading.Event()
+        self.pages_done = 0
+        self.error = None
+
+        batches = iter_ingest_batches(file_bytes, self.manifest, self.ingest, extractor=extractor)
+        if background:
+            threading.Thread(target=self._build_index, args=(batches,), name="span-ingest", daemon=True).start()
         else:
-            raise ValueError("Invalid vectorstore type. Choose 'chroma' or 'faiss'")
-
-        self.retriever = create_multi_vector_retriever(
-            vectorstore=self.vectorstore,
-            table_summaries=table_summaries,
-            tables=tables,
-            text_summaries=text_summaries,
-            texts=texts
-        )
+            self._build_index(batches)
+            if self.error is not None:
+                raise self.error
 
         # Define prompt template
         self.prompt = ChatPromptTemplate.from_template(
@@ -90,9 +131,55 @@ class SpanLLM:
         
         self.memory = ConversationBufferMemory(return_messages=True)
 
+    def _build_index(self, batches):
+        try:
+            for batch in batches:
+                summaries = [str(summary) for summary in batch.text_summaries + batch.table_summaries]
+                if isinstance(self.vectorstore, FAISS) and summaries:
+                    # Embedded before taking the lock; the adds under it are served from the embedding cache
+                    self.vectorstore.embeddings.embed_documents(summaries)
+                with self._index_lock:
+                    add_documents(self.retriever, batch.text_summaries, batch.texts, self.doc_hash)
+                    add_documents(self.retriever, batch.table_summaries, batch.tables, self.doc_hash)
+                self.pages_done = batch.pages_done
+        except Exception as e:
+            self.error = e
+            print(f"Document ingest failed after {self.pages_done} pages: {e}")
+        finally:
+            # Pages finished before a failure are kept, so the next upload resumes after them
+            try:
+                self.manifest.save(self.ingest.page_hashes)
+                save_document_retriever(self.retriever)
+            except OSError as e:
+                print(f"Could not save the ingest manifest or indexes: {e}")
+            self._ready.set()
+
+    @property
+    def progress(self):
+        """(pages indexed, total pages) of the document."""
+        return self.pages_done, len(self.ingest.page_hashes)
+
+    @property
+    def is_ready(self):
+        """True once ingest has finished, successfully or not."""
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Block until ingest finishes; returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    def get_context(self, user_input, normalized_tables=False):
+        """Retrieves the document context for a question, labelled by page."""
+        if isinstance(self.vectorstore, FAISS):
+            # As for adds, the question is embedded before the lock and served from the query cache under it
+            self.vectorstore.embeddings.embed_query(user_input)
+        with self._index_lock:
+            docs = self.retriever.invoke(user_input)
+        return format_context(docs, normalized_tables=normalized_tables)
+
     def get_response(self, user_input):
         """Generates a response using the retriever and conversation memory."""
-        context = self.retriever.invoke(user_input)
+        context = self.get_context(user_input)
         history = self.memory.buffer
 
         full_prompt = self.prompt.format(
@@ -1,39 +1,164 @@
-import uuid
-from langchain.retrievers.multi_vector import MultiVectorRetriever
+import os
+import hashlib
+from typing import Any
+from dotenv import load_dotenv, find_dotenv
+from langchain.retrievers.multi_vector import MultiVectorRetriever, SearchType
 from langchain.storage import InMemoryStore
 from langchain_core.documents import Document
+from FinChatbot.pipeline.elements import Element
+from FinChatbot.pipeline.sparse import RRF_K, reciprocal_rank_fusion
 
-def create_multi_vector_retriever(vectorstore, text_summaries, texts, table_summaries, tables):
+load_dotenv(find_dotenv())
 
-    # Initialize the storage layer
-    store = InMemoryStore()
-    id_key = "fintech-rag"
-    
-    # Create the multi-vector retriever
-    retriever = MultiVectorRetriever(
-        vectorstore = vectorstore,
-        docstore = store,
-        id_key = id_key,
-    )
-    
-    # Helper function to add documents to the vectorstore and docstore
-    def add_documents(retriever, doc_summaries, doc_contents):
+# With BM25 catching exact matches, fewer dense hits are needed for the same recall
+RETRIEVAL_DENSE_K = int(os.getenv("RETRIEVAL_DENSE_K", "3"))
+RETRIEVAL_SPARSE_K = int(os.getenv("RETRIEVAL_SPARSE_K", "4"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+
+def element_metadata(content):
+    """Metadata carried by an extracted element; plain strings have none."""
+    return content.metadata() if isinstance(content, Element) else {}
+
+def as_document(content):
+    """
+    Docstore value for an element: a Document keeping its page and ids, and for tables
+    the normalized numeric form, or the raw value.
+    """
+    if isinstance(content, Element):
+        metadata = content.metadata()
+        if content.table is not None:
+            metadata["table"] = content.table.to_dict()
+        return Document(page_content=content.content, metadata=metadata)
+    return content
+
+MVR_ID_KEY = "fintech-rag"
+
+class HybridMultiVectorRetriever(MultiVectorRetriever):
+    """
+    MultiVectorRetriever that also queries a BM25 index over the same element ids and
+    fuses both rankings by reciprocal rank fusion before loading the parent documents.
+    """
+
+    sparse_index: Any = None
+    sparse_k: int = RETRIEVAL_SPARSE_K
+    top_k: int = RETRIEVAL_TOP_K
+    rrf_k: int = RRF_K
+
+    def _dense_ids(self, query):
+        if self.search_type == SearchType.mmr:
+            sub_docs = self.vectorstore.max_marginal_relevance_search(query, **self.search_kwargs)
+        elif self.search_type == SearchType.similarity_score_threshold:
+            sub_docs = [doc for doc, _ in self.vectorstore.similarity_search_with_relevance_scores(query, **self.search_kwargs)]
+        else:
+            sub_docs = self.vectorstore.similarity_search(query, **self.search_kwargs)
+
+        ids = []
+        for doc in sub_docs:
+            doc_id = doc.metadata.get(self.id_key)
+            if doc_id is not None and doc_id not in ids:
+                ids.append(doc_id)
+        return ids
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        rankings = [self._dense_ids(query)]
+        if self.sparse_index is not None:
+            rankings.append([doc_id for doc_id, _ in self.sparse_index.search(query, self.sparse_k)])
+        ids = reciprocal_rank_fusion(rankings, self.rrf_k)[:self.top_k]
+        return [doc for doc in self.docstore.mget(ids) if doc is not None]
 
-        doc_ids = [str(uuid.uuid4()) for _ in doc_contents]
+def element_hash(content):
+    """Hash of an element's kind and content, the same in every document it appears in."""
+    kind = content.kind if isinstance(content, Element) else ""
+    return hashlib.sha256(f"{kind}\0{content}".encode("utf-8")).hexdigest()[:32]
 
+def element_doc_id(doc_hash, content):
+    """
+    Deterministic id of an element within a document: document hash, page and element hash.
+    The page is part of the id so an element that moved gets its new page number indexed.
+    """
+    page = content.page_number if isinstance(content, Element) else None
+    return f"{doc_hash[:16]}-{page or 0}-{element_hash(content)}"
+
+def existing_ids(vectorstore, ids):
+    """The subset of ids the vectorstore already holds."""
+    try:
+        return {doc.id for doc in vectorstore.get_by_ids(ids)}
+    except NotImplementedError:
+        # Chroma implements get() instead
+        return set(vectorstore.get(ids=ids, include=[])["ids"])
+
+def add_documents(retriever, doc_summaries, doc_contents, doc_hash=""):
+    """
+    Index summaries in the vectorstore and store the elements they stand for in the docstore.
+    Ids come from doc_hash and the element content, so adding the same elements again is a
+    no-op: summaries already in the vectorstore are not embedded or inserted twice.
+    With a hybrid retriever, elements missing from its BM25 index are added to it too.
+    Returns the ids of all the given elements.
+    """
+    if not doc_summaries:
+        return []
+
+    id_key = retriever.id_key
+    doc_ids = [element_doc_id(doc_hash, content) for content in doc_contents]
+
+    # First occurrence wins when an element repeats on the same page
+    unique = {}
+    for i, doc_id in enumerate(doc_ids):
+        unique.setdefault(doc_id, i)
+
+    # Parents go in first, so a search running meanwhile never hits a summary without one
+    stored = retriever.docstore.mget(list(unique))
+    missing = [(doc_id, as_document(doc_contents[i])) for (doc_id, i), value in zip(unique.items(), stored) if value is None]
+    if missing:
+        retriever.docstore.mset(missing)
+
+    present = existing_ids(retriever.vectorstore, list(unique))
+    new = [(doc_id, i) for doc_id, i in unique.items() if doc_id not in present]
+
+    if new:
+        # Summaries carry the element metadata so the vectorstore can filter by page or kind
         summary_docs = [
-            Document(page_content = str(s), metadata = {id_key: doc_ids[i]}) 
-            for i, s in enumerate(doc_summaries)
+            Document(page_content = str(doc_summaries[i]), metadata = {**element_metadata(doc_contents[i]), id_key: doc_id})
+            for doc_id, i in new
         ]
+        retriever.vectorstore.add_documents(summary_docs, ids = [doc_id for doc_id, _ in new])
+
+    sparse_index = getattr(retriever, "sparse_index", None)
+    if sparse_index is not None:
+        # Element text catches line items and figures, the summary its wording
+        indexed = sparse_index.ids()
+        sparse_new = [(doc_id, i) for doc_id, i in unique.items() if doc_id not in indexed]
+        if sparse_new:
+            sparse_index.add(
+                [doc_id for doc_id, _ in sparse_new],
+                [f"{doc_contents[i]}\n{doc_summaries[i]}" for _, i in sparse_new]
+            )
+
+    return doc_ids
+
+def create_multi_vector_retriever(vectorstore, text_summaries, texts, table_summaries, tables, docstore=None, doc_hash="", sparse_index=None):
 
-        retriever.vectorstore.add_documents(summary_docs)
-        retriever.docstore.mset(list(zip(doc_ids, doc_contents)))
+    # Initialize the storage layer; pass a SQLiteDocStore to keep parent documents on disk
+    store = docstore if docstore is not None else InMemoryStore()
     
-    # Add texts, tables
-    if text_summaries:
-        add_documents(retriever, text_summaries, texts)
+    # Create the multi-vector retriever; with a BM25 index, dense and sparse hits are fused
+    if sparse_index is not None:
+        retriever = HybridMultiVectorRetriever(
+            vectorstore = vectorstore,
+            docstore = store,
+            id_key = MVR_ID_KEY,
+            search_kwargs = {"k": RETRIEVAL_DENSE_K},
+            sparse_index = sparse_index,
+        )
+    else:
+        retriever = MultiVectorRetriever(
+            vectorstore = vectorstore,
+            docstore = store,
+            id_key = MVR_ID_KEY,
+        )
     
-    if table_summaries:
-        add_documents(retriever, table_summaries, tables)
+    # Add texts, tables; more can be added later with add_documents
+    add_documents(retriever, text_summaries, texts, doc_hash)
+    add_documents(retriever, table_summaries, tables, doc_hash)
     
-    return retriever
\ No newline at end of file
+    return retriever
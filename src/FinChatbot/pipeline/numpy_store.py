@@ -0,0 +1,218 @@
+'''
+Exact in-process vector index on NumPy, for single filings of a few thousand summaries.
+
+All vectors are L2-normalized float32 rows of one contiguous matrix, so a query is one
+matrix-vector product plus an argpartition for the top k, and a batch of queries is one
+matrix-matrix product. Saved indexes are reopened memory-mapped, which makes opening a
+filing cost next to nothing until it is searched.
+'''
+
+import os
+import json
+import uuid
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+def top_k(scores, k):
+    """Row-wise indices of the k highest scores, best first, by argpartition."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < scores.shape[-1]:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape[:-1] + (scores.shape[-1],))
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+class NumpyVectorStore(VectorStore):
+    """
+    Brute-force cosine similarity over a contiguous, normalized float32 matrix.
+
+    Rows are appended into a buffer that doubles when full; adding an id that is already
+    present replaces its row. With a path, save writes the matrix as .npy beside a JSON file
+    of ids, texts and metadata, and load maps the matrix read-only until the next write.
+    """
+
+    def __init__(self, embedding, path=None, mmap=True):
+        self.embedding = embedding
+        self.path = path
+        self.mmap = mmap
+        self._matrix = None
+        self._size = 0
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @classmethod
+    def load(cls, embedding, path, mmap=True):
+        """Open a saved index, or an empty one if there is nothing at path yet."""
+        store = cls(embedding, path, mmap)
+        try:
+            with open(os.path.join(path, "documents.json"), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        except (OSError, ValueError):
+            return store
+
+        if len(data["ids"]) != len(matrix) or len(matrix) == 0:
+            # Half-written save, or an empty index whose dimension is unknown; start over
+            # rather than serve misaligned rows or refuse the first add
+            return store
+        # Plain ndarray view of the map: no copy, and none of np.memmap's per-operation overhead
+        store._matrix = matrix.view(np.ndarray) if isinstance(matrix, np.memmap) else matrix
+        store._size = len(matrix)
+        store._ids = data["ids"]
+        store._texts = data["texts"]
+        store._metadatas = data["metadatas"]
+        store._rows = {doc_id: i for i, doc_id in enumerate(store._ids)}
+        return store
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            matrix = np.array(self._matrix[:self._size]) if self._matrix is not None else np.zeros((0, 0), np.float32)
+            data = {"ids": list(self._ids), "texts": list(self._texts), "metadatas": list(self._metadatas)}
+
+        os.makedirs(self.path, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        documents_path = os.path.join(self.path, "documents.json")
+        with open(vectors_path + suffix, "wb") as f:
+            np.save(f, matrix)
+        with open(documents_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(vectors_path + suffix, vectors_path)
+        os.replace(documents_path + suffix, documents_path)
+
+    def _reserve(self, rows, dim):
+        """Make the buffer writable with room for rows more vectors."""
+        if self._matrix is None or self._size == 0:
+            self._matrix = np.empty((max(rows, 64), dim), dtype=np.float32)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match the index ({self._matrix.shape[1]})")
+        needed = self._size + rows
+        if not self._matrix.flags.writeable or needed > len(self._matrix):
+            # A fresh buffer, so views handed to running searches are never written to
+            buffer = np.empty((max(needed, 2 * len(self._matrix), 64), dim), dtype=np.float32)
+            buffer[:self._size] = self._matrix[:self._size]
+            self._matrix = buffer
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(self.embedding.embed_documents(texts))
+
+        with self._lock:
+            self._reserve(len(texts), vectors.shape[1])
+            for doc_id, text, metadata, vector in zip(ids, texts, metadatas, vectors):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[doc_id] = row
+                    self._ids.append(doc_id)
+                    self._texts.append(text)
+                    self._metadatas.append(metadata)
+                else:
+                    self._texts[row] = text
+                    self._metadatas[row] = metadata
+                self._matrix[row] = vector
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if ids is None:
+            return False
+        with self._lock:
+            drop = {self._rows[doc_id] for doc_id in ids if doc_id in self._rows}
+            if not drop:
+                return True
+            keep = [i for i in range(self._size) if i not in drop]
+            # Compacted into a new array; searches holding the old one are unaffected
+            self._matrix = self._matrix[keep] if keep else None
+            self._size = len(keep)
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._rows = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        return True
+
+    def get_by_ids(self, ids, /):
+        with self._lock:
+            return [
+                Document(id=doc_id, page_content=self._texts[self._rows[doc_id]], metadata=self._metadatas[self._rows[doc_id]])
+                for doc_id in ids if doc_id in self._rows
+            ]
+
+    def stored_ids(self):
+        with self._lock:
+            return list(self._ids)
+
+    def _snapshot(self):
+        # Rows below _size are only ever replaced, and delete builds new lists,
+        # so the current lists can be shared without copying
+        with self._lock:
+            if self._matrix is None or self._size == 0:
+                return None, [], [], []
+            return self._matrix[:self._size], self._ids, self._texts, self._metadatas
+
+    def similarity_search_by_vector_batch(self, embeddings, k=4):
+        """(Document, cosine similarity) lists for a batch of query vectors, with one matmul."""
+        matrix, ids, texts, metadatas = self._snapshot()
+        if matrix is None:
+            return [[] for _ in embeddings]
+        scores = _normalize(embeddings) @ matrix.T
+        results = []
+        for row_scores, rows in zip(scores, top_k(scores, k)):
+            results.append([
+                (Document(id=ids[i], page_content=texts[i], metadata=metadatas[i]), float(row_scores[i]))
+                for i in rows
+            ])
+        return results
+
+    def similarity_search_batch(self, queries, k=4):
+        """Top k Documents for each of several queries."""
+        vectors = [self.embedding.embed_query(query) for query in queries]
+        return [[doc for doc, _ in hits] for hits in self.similarity_search_by_vector_batch(vectors, k)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        return self.similarity_search_by_vector_batch([embedding], k)[0]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] to a relevance score in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, path=None, **kwargs):
+        store = cls(embedding, path=path)
+        store.add_texts(texts, metadatas, ids)
+        return store
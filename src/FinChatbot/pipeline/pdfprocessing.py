@@ -1,65 +1,184 @@
-'''prompt: I uploaded extraction.py, app.py and llm_chain.py files and asked now i need to implement 
+'''prompt: I uploaded extraction.py, app.py and llm_chain.py files and asked now i need to implement
 parallel processing to optimize the pdf processing
 what changes need to be done in which file
 
 '''
 
-import requests
-import os
-from dotenv import load_dotenv, find_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import io
+import json
+import hashlib
+from pypdf import PdfReader, PdfWriter
+from FinChatbot.pipeline.cache import extraction_cache
+from FinChatbot.pipeline.client import partition_client
+from FinChatbot.pipeline.elements import iter_elements, iter_elements_from_file
+from FinChatbot.pipeline.extraction import EXTRACTOR_SETTINGS, split_elements
 
-load_dotenv(find_dotenv())
+# Every page costs something to partition even when its content stream is tiny
+# (scanned pages, page breaks), so each page starts with this base weight.
+PAGE_BASE_WEIGHT = 2048
 
-UNSTRUCTURED_API_URL = os.getenv("UNSTRUCTURED_API_URL")
-UNSTRUCTURED_API_KEY = os.getenv("UNSTRUCTURED_API_KEY")
+def page_weight(page):
+    """Estimate the partitioning cost of a page from the size of its content stream."""
+    try:
+        contents = page.get_contents()
+        size = len(contents.get_data()) if contents is not None else 0
+    except Exception:
+        size = 0
+    return PAGE_BASE_WEIGHT + size
+
+
+def plan_page_ranges(weights, num_chunks):
+    """
+    Split pages into at most num_chunks contiguous (start, end) ranges of similar total weight.
+    Ranges are zero based and end exclusive.
+    """
+    num_pages = len(weights)
+    num_chunks = max(1, min(num_chunks, num_pages))
+    remaining = float(sum(weights))
+
+    ranges = []
+    start = 0
+    for chunk in range(num_chunks):
+        chunks_left = num_chunks - chunk
+        if chunks_left == 1:
+            ranges.append((start, num_pages))
+            break
+
+        # Aim for an even share of what is left, but leave one page for every later chunk
+        target = remaining / chunks_left
+        end = start
+        acc = 0.0
+        while end < num_pages - (chunks_left - 1) and (end == start or acc + weights[end] / 2 <= target):
+            acc += weights[end]
+            end += 1
+
+        ranges.append((start, end))
+        remaining -= acc
+        start = end
+
+    return ranges
+
+
+def split_pdf(file_bytes, num_chunks=5):
+    """
+    Split a PDF into valid sub-PDFs along page boundaries.
+    Returns a list of (starting_page_number, chunk_bytes) in page order.
+    """
+    reader = PdfReader(io.BytesIO(file_bytes))
+    num_pages = len(reader.pages)
+
+    if num_chunks <= 1 or num_pages <= 1:
+        return [(1, file_bytes)]
+
+    weights = [page_weight(page) for page in reader.pages]
+
+    chunks = []
+    for start, end in plan_page_ranges(weights, num_chunks):
+        writer = PdfWriter()
+        for i in range(start, end):
+            writer.add_page(reader.pages[i])
+
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        chunks.append((start + 1, buffer.getvalue()))
+
+    return chunks
+
+
+def _hash_xobjects(digest, page):
+    # Some producers draw the whole page through a form XObject, so the page content
+    # stream alone can be identical across different pages
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is None:
+        return
+    xobjects = xobjects.get_object()
+    for name in sorted(xobjects):
+        xobject = xobjects[name].get_object()
+        digest.update(str(name).encode("utf-8"))
+        if xobject.get("/Subtype") == "/Form":
+            digest.update(xobject.get_data())
+        else:
+            # Images: size and shape are enough without decoding the pixels
+            digest.update(repr((xobject.get("/Length"), xobject.get("/Width"), xobject.get("/Height"))).encode("utf-8"))
+
+
+def page_hashes(file_bytes):
+    """
+    Content hash of every page, from its size, content stream and XObjects. Pages that
+    were not touched in a re-issued filing keep their hash even when other pages change.
+    """
+    reader = PdfReader(io.BytesIO(file_bytes))
+    hashes = []
+    for page in reader.pages:
+        digest = hashlib.sha256(repr(tuple(page.mediabox)).encode("utf-8"))
+        try:
+            contents = page.get_contents()
+            if contents is not None:
+                digest.update(contents.get_data())
+            _hash_xobjects(digest, page)
+        except Exception:
+            pass
+        hashes.append(digest.hexdigest())
+    return hashes
+
+
+def select_pages(file_bytes, page_indices):
+    """Write the given zero based pages of a PDF, in order, into a new PDF."""
+    reader = PdfReader(io.BytesIO(file_bytes))
+    writer = PdfWriter()
+    for i in page_indices:
+        writer.add_page(reader.pages[i])
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def iter_pdf_parallel(file_bytes, num_chunks=5):
+    """
+    Yield the raw Unstructured elements of a PDF in page order, as the responses arrive.
+    The file is split into num_chunks page ranges of similar weight, each range is sent
+    as its own valid PDF concurrently, and each response is parsed while it streams in:
+    the elements of the first range are yielded before the later ranges finish downloading.
+    Elements are streamed into the extraction cache on the way through, and files that
+    were already processed are streamed from it.
+    Raises ExtractionError if a range cannot be processed after retries.
+    """
+    cache_key = extraction_cache.make_key(file_bytes, EXTRACTOR_SETTINGS)
+    cached_path = extraction_cache.lookup(cache_key)
+    if cached_path is not None:
+        yield from iter_elements_from_file(cached_path)
+        return
 
-def send_request(file_chunk):
-    """Helper function to send the PDF chunk to the Unstructured API."""
-    headers = {
-        "Accept": "application/json",
-        "unstructured-api-key": UNSTRUCTURED_API_KEY
-    }
-    files = {
-        "files": ("document", file_chunk, "application/pdf")
-    }
+    chunks = split_pdf(file_bytes, num_chunks)
 
+    # All ranges go out together over the shared connection pool and are read in
+    # request order, i.e. page order; later ranges keep downloading meanwhile. A range
+    # that still fails after retries raises ExtractionError instead of dropping its pages.
+    responses = partition_client.stream_many([
+        (chunk, {"starting_page_number": starting_page_number})
+        for starting_page_number, chunk in chunks
+    ])
     try:
-        response = requests.post(UNSTRUCTURED_API_URL, headers=headers, files=files)
-        response.raise_for_status()  # Raise an error for non-200 status codes
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"API Request failed: {str(e)}")
-        return None
+        # The cache entry is one element array, only kept if every range arrives
+        with extraction_cache.writer(cache_key) as f:
+            f.write(b"[")
+            first = True
+            for response in responses:
+                for element in iter_elements(response):
+                    f.write((b"" if first else b",") + json.dumps(element).encode("utf-8"))
+                    first = False
+                    yield element
+            f.write(b"]")
+    finally:
+        for response in responses:
+            response.close()
 
 
 def process_pdf_parallel(file_bytes, num_chunks=5):
     """
     Process a PDF file in parallel to extract tables and text content.
-    This will break the file into chunks (num_chunks) and process them concurrently.
+    See iter_pdf_parallel for how the document is split and cached.
     """
-    chunk_size = len(file_bytes) // num_chunks
-    futures = []
-    
-    with ThreadPoolExecutor(max_workers=num_chunks) as executor:
-        # Split the file into chunks and process each chunk in parallel
-        for i in range(num_chunks):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if i < num_chunks - 1 else len(file_bytes)
-            chunk = file_bytes[start:end]
-            futures.append(executor.submit(send_request, chunk))
-        
-        # Collect results as they finish
-        tables = []
-        texts = []
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
-                for element in result:
-                    if isinstance(element, dict):
-                        if element.get("type") == "Table":
-                            tables.append(element["metadata"]["text_as_html"])
-                        elif element.get("type") in ["NarrativeText", "UncategorizedText"]:
-                            texts.append(element["text"])
-        
-        return tables, texts
+    return split_elements(iter_pdf_parallel(file_bytes, num_chunks))
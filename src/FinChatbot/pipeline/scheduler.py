@@ -0,0 +1,171 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import openai
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv())
+
+# Quota of the summarization model; set these to the limits of the account tier
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute, holding at most capacity."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until amount tokens are available and take them."""
+        # A request larger than the bucket would never fit; it waits for a full bucket instead
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reported the quota as exhausted."""
+        with self._lock:
+            self._refill()
+            self._tokens = 0
+
+class AdaptiveLimit:
+    """
+    Concurrency limit that halves on rate limiting and grows by one after a run of
+    successes (AIMD), so the scheduler settles just under what the quota allows.
+    """
+
+    def __init__(self, maximum, increase_after=10):
+        self.maximum = maximum
+        self.limit = maximum
+        self.increase_after = increase_after
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_rate_limited(self):
+        with self._condition:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def _is_rate_limited(error):
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+def _is_retryable(error):
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)):
+        return True
+    return _is_rate_limited(error) or getattr(error, "status_code", None) in (408, 409, 500, 502, 503, 504)
+
+class LLMScheduler:
+    """
+    Runs LLM calls under the configured requests- and tokens-per-minute quota.
+
+    Every call takes one request and its estimated tokens from two token buckets before it
+    starts. Concurrency adapts to 429 responses, and each failed item is retried on its own
+    with jittered backoff, so one bad item never fails the others.
+    """
+
+    def __init__(self,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_retries=LLM_MAX_RETRIES,
+                 backoff_base=1.0,
+                 backoff_max=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveLimit(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, fn, item, estimated_tokens=1):
+        """Run fn(item) within the quota, retrying transient errors. Raises the last error."""
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire(1)
+            self.tokens.acquire(estimated_tokens)
+            try:
+                with self.concurrency:
+                    result = fn(item)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                if _is_rate_limited(e):
+                    self.concurrency.on_rate_limited()
+                    self.tokens.drain()
+                time.sleep(self._backoff(attempt, _retry_after(e)))
+            else:
+                self.concurrency.on_success()
+                return result
+
+    def map(self, fn, items, estimate=None):
+        """
+        Apply fn to every item within the quota and return a list of (result, error) pairs
+        in input order; error is None on success.
+        """
+        estimate = estimate or (lambda item: 1)
+
+        def run(item):
+            try:
+                return self.call(fn, item, estimate(item)), None
+            except Exception as e:
+                return None, e
+
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(run, items))
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,145 @@
+'''
+BM25 sparse index over the indexed elements, fused with dense retrieval by reciprocal rank fusion.
+
+Dense summary vectors miss exact-match questions on line-item names, tickers and specific
+figures; BM25 over the element text and its summary catches those, and scoring it is a few
+array operations per query term.
+'''
+
+import os
+import re
+import json
+import threading
+import numpy as np
+from FinChatbot.pipeline.extractive import STOPWORDS
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+# Words, tickers and figures: "ebitda", "q3", "10-k", "1,234.5", "12%"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,&'\-][a-z0-9]+)*%?")
+
+RRF_K = 60
+
+def tokenize(text):
+    """Lowercased terms of a text with HTML tags dropped; thousands separators are removed from numbers."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(TAG_PATTERN.sub(" ", str(text)).lower()):
+        if token in STOPWORDS:
+            continue
+        if token[0].isdigit():
+            token = token.replace(",", "")
+        tokens.append(token)
+    return tokens
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    # Ties keep the order of first appearance, dense results first
+    return sorted(scores, key=scores.get, reverse=True)
+
+class BM25Index:
+    """
+    Okapi BM25 over documents keyed by id, kept as per-document term counts.
+
+    Documents can be added and deleted at any time; the postings are rebuilt as NumPy
+    arrays on the first search after a change. With a path the index is saved as JSON,
+    next to the vectorstore it complements.
+    """
+
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._docs = {}
+        self._postings = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, k1=1.5, b=0.75):
+        index = cls(path, k1, b)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index._docs = json.load(f).get("docs", {})
+        except (OSError, ValueError):
+            pass
+        return index
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"docs": self._docs})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def ids(self):
+        with self._lock:
+            return set(self._docs)
+
+    def add(self, ids, texts):
+        """Index texts under ids, replacing earlier entries with the same id."""
+        entries = {}
+        for doc_id, text in zip(ids, texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            entries[doc_id] = counts
+        with self._lock:
+            self._docs.update(entries)
+            self._postings = None
+
+    def delete(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                self._docs.pop(doc_id, None)
+            self._postings = None
+
+    def _build(self):
+        doc_ids = list(self._docs)
+        postings = {}
+        lengths = np.zeros(len(doc_ids), dtype=np.float32)
+        for i, doc_id in enumerate(doc_ids):
+            counts = self._docs[doc_id]
+            lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(tf)
+
+        n = len(doc_ids)
+        avgdl = float(lengths.mean()) if n and lengths.sum() else 1.0
+        # Length normalization per document, shared by every query term
+        norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+        arrays = {}
+        for term, (rows, tfs) in postings.items():
+            rows = np.asarray(rows, dtype=np.int64)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = np.log(1.0 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            arrays[term] = (rows, (idf * tfs * (self.k1 + 1) / (tfs + norm[rows])).astype(np.float32))
+        return doc_ids, arrays
+
+    def search(self, query, k=4):
+        """Top k (id, score) pairs for a query, best first; documents sharing no term are left out."""
+        with self._lock:
+            if self._postings is None:
+                self._postings = self._build()
+            doc_ids, postings = self._postings
+
+        if k <= 0:
+            return []
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term in postings:
+                rows, weights = postings[term]
+                scores[rows] += weights
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(doc_ids[i], float(scores[i])) for i in matched]
@@ -1,12 +1,42 @@
 import os
+import json
+import time
+import threading
+from functools import lru_cache
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from FinChatbot.pipeline.cache import summary_cache
+from FinChatbot.pipeline.extractive import extractive_summaries
+from FinChatbot.pipeline.scheduler import llm_scheduler
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
 
-def get_summary(tables, texts):
-    prompt_text = '''   
+# "llm" for OpenAI summaries, "extractive" for the offline summarizer that needs no API key
+SUMMARY_BACKEND = os.getenv("SUMMARY_BACKEND", "llm")
+SUMMARY_BACKENDS = ("llm", "extractive")
+
+# Bump whenever a summary prompt changes meaning; cached summaries of other versions are not reused
+PROMPT_VERSION = "1"
+
+# Tokens a single summary is expected to produce, counted against the tokens-per-minute quota
+SUMMARY_OUTPUT_TOKENS = 250
+
+# Packing: short text elements are summarized many to a call
+SUMMARY_PACKING = os.getenv("SUMMARY_PACKING", "1") == "1"
+SUMMARY_PACK_TOKENS = int(os.getenv("SUMMARY_PACK_TOKENS", "3000"))
+SUMMARY_PACK_MAX_ITEMS = int(os.getenv("SUMMARY_PACK_MAX_ITEMS", "25"))
+PACKED_ELEMENT_MAX_TOKENS = int(os.getenv("PACKED_ELEMENT_MAX_TOKENS", "200"))
+PACKED_OUTPUT_TOKENS = 80
+
+# Text elements shorter than this are embedded as they are; a summary would be longer than the text
+SUMMARY_MIN_WORDS = int(os.getenv("SUMMARY_MIN_WORDS", "40"))
+
+# Assumed latency of one summarization call, for reports on runs that made no calls
+SUMMARY_CALL_SECONDS = 3.0
+
+SUMMARY_PROMPT = '''
     Generate a concise and accurate financial summary of a company's performance in a single paragraph based on the provided data, the data can be either table or a text. \
     Each row of the data should be individually analyzed, ensuring that all relevant values and trends are considered. The summary should report precise values and trends directly from the data, emphasizing critical metrics such as revenue, profit, growth trends, significant changes, and anomalies. \
     It must use clear, professional language without jargon, focusing on key aspects like profitability, cash flow, debt levels, and performance ratios. Assumptions or estimates should not be included. \
@@ -15,15 +45,231 @@ def get_summary(tables, texts):
     Data: {element}
     '''
 
-    prompt = ChatPromptTemplate.from_template(prompt_text)
+PACKED_SUMMARY_PROMPT = '''
+    Below are numbered text passages from a company's financial report. Summarize each passage separately in one to three sentences. \
+    Report precise values and trends directly from the passage, emphasizing critical metrics such as revenue, profit, growth trends, significant changes, and anomalies. \
+    Use clear, professional language without jargon. Assumptions or estimates should not be included, and each summary must only use its own passage.
+
+    Respond with a JSON object of the form {{"summaries": [{{"index": 0, "summary": "..."}}]}} with exactly one entry per passage.
+
+    Passages:
+    {elements}
+    '''
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) for budgeting and reporting."""
+    return max(1, len(text) // 4)
+
+@lru_cache(maxsize=None)
+def _summary_chain(model_name):
+    """Summarization chain, built once per model."""
+    prompt = ChatPromptTemplate.from_template(SUMMARY_PROMPT)
+    # Retries are left to the scheduler so it sees every 429
+    model = ChatOpenAI(temperature = 0, model = model_name, max_retries = 0)
+    return {"element": lambda x : str(x)} | prompt | model | StrOutputParser()
+
+@lru_cache(maxsize=None)
+def _packed_summary_chain(model_name):
+    """Chain summarizing a list of elements in one call, answering in JSON mode."""
+    prompt = ChatPromptTemplate.from_template(PACKED_SUMMARY_PROMPT)
+    model = ChatOpenAI(temperature = 0, model = model_name, max_retries = 0,
+                       model_kwargs = {"response_format": {"type": "json_object"}})
+    format_elements = lambda pack: "\n".join(f"[{i}] {element}" for i, element in enumerate(pack))
+    return {"elements": format_elements} | prompt | model | StrOutputParser()
+
+class SummaryReport:
+    """Where the summaries of one ingest came from, and what skipping the LLM saved."""
+
+    def __init__(self):
+        self.elements = 0
+        self.cached = 0
+        self.raw = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def timed(self, fn):
+        """Wrap an LLM call so its count and latency are recorded."""
+        def call(item):
+            started = time.perf_counter()
+            try:
+                return fn(item)
+            finally:
+                with self._lock:
+                    self.llm_calls += 1
+                    self.llm_seconds += time.perf_counter() - started
+        return call
+
+    @property
+    def seconds_saved(self):
+        """Call time avoided by embedding short elements raw, at this run's average latency."""
+        average = self.llm_seconds / self.llm_calls if self.llm_calls else SUMMARY_CALL_SECONDS
+        return self.raw * average
+
+    def __str__(self):
+        return (f"summaries: {self.elements} elements, {self.cached} cached, {self.raw} embedded raw "
+                f"(~{self.seconds_saved:.1f}s of calls skipped), {self.llm_calls} LLM calls "
+                f"in {self.llm_seconds:.1f}s, {self.failed} failed")
+
+def needs_summary(element):
+    """Tables and long text blocks are summarized; short texts are their own summary."""
+    return getattr(element, "kind", "text") == "table" or len(str(element).split()) >= SUMMARY_MIN_WORDS
+
+def _is_packable(element):
+    return getattr(element, "kind", "text") != "table" and estimate_tokens(str(element)) <= PACKED_ELEMENT_MAX_TOKENS
+
+def _packs(items):
+    """Greedily group (key, element) items into packs within the token and item budgets."""
+    pack, pack_tokens = [], 0
+    for key, element in items:
+        tokens = estimate_tokens(str(element))
+        if pack and (pack_tokens + tokens > SUMMARY_PACK_TOKENS or len(pack) >= SUMMARY_PACK_MAX_ITEMS):
+            yield pack
+            pack, pack_tokens = [], 0
+        pack.append((key, element))
+        pack_tokens += tokens
+    if pack:
+        yield pack
+
+def parse_packed_summaries(output, count):
+    """
+    Map a packed JSON response back to {index: summary}. Entries with a missing or
+    out-of-range index or an empty summary are left out, as is everything if the JSON is malformed.
+    """
+    try:
+        entries = json.loads(output).get("summaries", [])
+    except (TypeError, ValueError, AttributeError):
+        return {}
+
+    summaries = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index, summary = entry.get("index"), entry.get("summary")
+        if isinstance(index, int) and 0 <= index < count and isinstance(summary, str) and summary.strip():
+            summaries.setdefault(index, summary.strip())
+    return summaries
+
+def _summarize_packed(items, model_name, report):
+    """Summarize packs of short elements; returns the summaries and the items left over."""
+    chain = _packed_summary_chain(model_name)
+    prompt_tokens = estimate_tokens(PACKED_SUMMARY_PROMPT)
+    packs = list(_packs(items))
+    results = llm_scheduler.map(
+        report.timed(lambda pack: chain.invoke([element for _, element in pack])),
+        packs,
+        estimate=lambda pack: prompt_tokens + sum(estimate_tokens(str(e)) + PACKED_OUTPUT_TOKENS for _, e in pack)
+    )
+
+    summaries, leftovers = {}, []
+    for pack, (output, error) in zip(packs, results):
+        parsed = parse_packed_summaries(output, len(pack)) if error is None else {}
+        for i, (key, element) in enumerate(pack):
+            if i in parsed:
+                summaries[key] = parsed[i]
+            else:
+                leftovers.append((key, element))
+
+    print(f"Packed summarization: {len(items)} elements in {len(packs)} calls, "
+          f"{len(leftovers)} falling back to single calls")
+    return summaries, leftovers
+
+def summarize(elements, model_name=SUMMARY_MODEL, packing=SUMMARY_PACKING, report=None, backend=None):
+    """
+    Summaries for a list of elements, in order. Text elements under SUMMARY_MIN_WORDS
+    are returned as their own summary without an LLM call. Cached summaries are served from the
+    summary cache and only the misses are sent to the LLM, each distinct content once,
+    through the rate-limited scheduler. With packing, short text elements are summarized
+    many to a call and any the packed answer misses are retried one by one. An element
+    whose call still fails after retries keeps its own text as its summary and is not
+    cached, so a later ingest tries again. Pass a SummaryReport to collect statistics.
+    backend "extractive" summarizes locally instead, without the LLM or the cache.
+    """
+    backend = backend or SUMMARY_BACKEND
+    if backend not in SUMMARY_BACKENDS:
+        raise ValueError(f"Unknown summary backend {backend!r}; choose one of {', '.join(SUMMARY_BACKENDS)}")
+    report = report if report is not None else SummaryReport()
+    report.elements += len(elements)
+
+    results = [None] * len(elements)
+    selected = []
+    for i, element in enumerate(elements):
+        if needs_summary(element):
+            selected.append(i)
+        else:
+            results[i] = str(element)
+    report.raw += len(elements) - len(selected)
+
+    if backend == "extractive":
+        for i, summary in zip(selected, extractive_summaries([elements[i] for i in selected])):
+            results[i] = summary
+        return results
+
+    packable = [packing and _is_packable(elements[i]) for i in selected]
+    keys = [
+        summary_cache.make_key(str(elements[i]), PACKED_SUMMARY_PROMPT if packed else SUMMARY_PROMPT, model_name, PROMPT_VERSION)
+        for i, packed in zip(selected, packable)
+    ]
+    # A packable element the packed answer missed was summarized on its own and cached under
+    # the single-call prompt, so that key is looked up too
+    single_keys = {
+        key: summary_cache.make_key(str(elements[i]), SUMMARY_PROMPT, model_name, PROMPT_VERSION)
+        for key, i, packed in zip(keys, selected, packable) if packed
+    }
+    summaries = summary_cache.get_many(keys + list(single_keys.values()))
+    for key, single_key in single_keys.items():
+        if key not in summaries and single_key in summaries:
+            summaries[key] = summaries[single_key]
+    report.cached += sum(1 for key in keys if key in summaries)
+
+    misses = {}
+    packed_misses = {}
+    for key, i, packed in zip(keys, selected, packable):
+        if key not in summaries:
+            (packed_misses if packed else misses).setdefault(key, elements[i])
+
+    new_summaries = {}
+    fallbacks = set()
+    if packed_misses:
+        packed_summaries, leftovers = _summarize_packed(list(packed_misses.items()), model_name, report)
+        new_summaries.update(packed_summaries)
+        misses.update(leftovers)
+        fallbacks.update(key for key, _ in leftovers)
+
+    if misses:
+        chain = _summary_chain(model_name)
+        prompt_tokens = estimate_tokens(SUMMARY_PROMPT) + SUMMARY_OUTPUT_TOKENS
+        outcomes = llm_scheduler.map(
+            report.timed(chain.invoke),
+            list(misses.values()),
+            estimate=lambda element: prompt_tokens + estimate_tokens(str(element))
+        )
+
+        for (key, element), (summary, error) in zip(misses.items(), outcomes):
+            if error is not None:
+                report.failed += 1
+                print(f"Summarization failed, using the element text instead: {error}")
+                summaries[key] = str(element)
+            else:
+                new_summaries[key] = summary
 
-    model = ChatOpenAI(temperature = 0, model = "gpt-4o-mini")
-    summary_chain = {"element": lambda x : x} | prompt | model | StrOutputParser()
+    if new_summaries:
+        # Leftovers were answered by SUMMARY_PROMPT, so they are cached under its key, not the packed one
+        summary_cache.put_many(
+            [(single_keys[key] if key in fallbacks else key, summary) for key, summary in new_summaries.items()],
+            prompt_version=PROMPT_VERSION, model=model_name
+        )
+        summaries.update(new_summaries)
 
-    table_summaries = []
-    table_summaries = summary_chain.batch(tables, {'max_concurrency':5})
+    for i, key in zip(selected, keys):
+        results[i] = summaries[key]
+    return results
 
-    text_summaries = []
-    text_summaries = summary_chain.batch(texts, {'max_concurrency':5})
+def get_summary(tables, texts, report=None, backend=None):
+    # Tables and texts share one scheduled run so the two never wait on each other
+    summaries = summarize(list(tables) + list(texts), report=report, backend=backend)
+    table_summaries = summaries[:len(tables)]
+    text_summaries = summaries[len(tables):]
 
-    return table_summaries, text_summaries
\ No newline at end of file
+    return table_summaries, text_summaries
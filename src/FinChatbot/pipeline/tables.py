@@ -0,0 +1,233 @@
+import re
+import numpy as np
+from html.parser import HTMLParser
+
+# "(in millions, except per share amounts)" and similar notes
+SCALE_PATTERN = re.compile(r"\bin\s+(thousands|millions|billions)\b", re.IGNORECASE)
+SCALES = {"thousands": 1e3, "millions": 1e6, "billions": 1e9}
+
+# Rows that are never scaled by the table note: per-share amounts, ratios and counts
+UNSCALED_ROW_PATTERN = re.compile(
+    r"per\s+share|\beps\b|margin|ratio|%|\bnumber\s+of\b|\bemployees\b|\bheadcount\b",
+    re.IGNORECASE
+)
+
+# A figure with optional sign, thousands separators and decimals, e.g. "(1,013)", "-4.5", "86,310"
+NUMBER_PATTERN = re.compile(r"(\()?\s*([-−–])?\s*(\d[\d,]*(?:\.\d+)?|\.\d+)\s*(\))?")
+EMPTY_CELL_PATTERN = re.compile(r"^[\s$%—–−\-¢]*$")
+# Cells holding only the currency sign of the figure next to them, or the "%" or ")" after it,
+# as SEC filings lay them out
+SYMBOL_CELL_PATTERN = re.compile(r"^\s*(?:[$€£¥]|%|\))\s*$")
+
+class _TableHTMLParser(HTMLParser):
+    """Collects rows of (text, is_header, colspan) cells from a text_as_html table."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._row = None
+        self._cell = None
+        self._in_thead = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "thead":
+            self._in_thead = True
+        elif tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            attrs = dict(attrs)
+            try:
+                colspan = max(1, int(attrs.get("colspan") or 1))
+            except ValueError:
+                colspan = 1
+            self._cell = {"text": [], "header": tag == "th" or self._in_thead, "colspan": colspan}
+
+    def handle_endtag(self, tag):
+        if tag == "thead":
+            self._in_thead = False
+        elif tag in ("td", "th") and self._cell is not None:
+            self._cell["text"] = " ".join("".join(self._cell["text"]).split())
+            self._row.append(self._cell)
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["text"].append(data)
+
+def parse_number(cell):
+    """
+    Parse a financial table cell into (value, is_percent).
+    Handles $, thousands separators, (123) negatives and %; returns (nan, False) for text or blanks.
+    """
+    if EMPTY_CELL_PATTERN.match(cell):
+        return np.nan, False
+
+    match = NUMBER_PATTERN.search(cell)
+    if match is None:
+        return np.nan, False
+
+    # Words or a second figure besides the match mean this is a label, not a value
+    rest = cell[:match.start()] + cell[match.end():]
+    if re.search(r"[A-Za-z]{2,}|\d", rest):
+        return np.nan, False
+
+    open_paren, sign, digits, close_paren = match.groups()
+    value = float(digits.replace(",", ""))
+    if sign or (open_paren and (close_paren or ")" in rest)):
+        value = -value
+    return value, "%" in cell
+
+def detect_scale(*texts):
+    """Scale factor from an 'in thousands/millions/billions' note in any of the texts."""
+    for text in texts:
+        match = SCALE_PATTERN.search(text or "")
+        if match:
+            return SCALES[match.group(1).lower()], match.group(1).lower()
+    return 1.0, None
+
+def _format_value(value, is_percent):
+    if np.isnan(value):
+        return ""
+    text = f"{value:,.0f}" if float(value).is_integer() else f"{value:,.4f}".rstrip("0")
+    return f"{text}%" if is_percent else text
+
+class NormalizedTable:
+    """
+    A table parsed once at ingest into typed columns.
+
+    row_labels holds the first column, columns the header of every value column, and values a
+    float64 matrix (rows x value columns) with the scale note applied and NaN for blanks.
+    percent marks cells that were percentages; those, per-share and count rows are never scaled,
+    and a row with its own note ("Shares (in millions)") takes that scale instead.
+    """
+    __slots__ = ("columns", "row_labels", "values", "percent", "scale", "unit")
+
+    def __init__(self, columns, row_labels, values, percent, scale=1.0, unit=None):
+        self.columns = columns
+        self.row_labels = row_labels
+        self.values = values
+        self.percent = percent
+        self.scale = scale
+        self.unit = unit
+
+    def find_rows(self, label):
+        """Indices of rows whose label contains the given text (case-insensitive)."""
+        label = label.lower()
+        return [i for i, row_label in enumerate(self.row_labels) if label in row_label.lower()]
+
+    def to_dict(self):
+        return {
+            "columns": self.columns,
+            "row_labels": self.row_labels,
+            "values": [[None if np.isnan(v) else float(v) for v in row] for row in self.values],
+            "percent": self.percent.tolist(),
+            "scale": self.scale,
+            "unit": self.unit
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        columns = data["columns"]
+        values = np.array(
+            [[np.nan if v is None else v for v in row] for row in data["values"]],
+            dtype=np.float64
+        ).reshape(len(data["row_labels"]), len(columns))
+        percent = np.array(data["percent"], dtype=bool).reshape(values.shape)
+        return cls(columns, data["row_labels"], values, percent, data["scale"], data["unit"])
+
+    def to_text(self):
+        """Plain pipe-separated rendering with the normalized numbers, for LLM context."""
+        lines = []
+        if self.unit:
+            lines.append(f"(values converted from {self.unit}; per-share amounts, counts and percentages as reported)")
+        lines.append(" | ".join(["Item"] + self.columns))
+        for label, row, percent in zip(self.row_labels, self.values, self.percent):
+            cells = [_format_value(v, p) for v, p in zip(row, percent)]
+            lines.append(" | ".join([label] + cells))
+        return "\n".join(lines)
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.values, index=self.row_labels, columns=self.columns)
+
+def _expand(row):
+    # Placeholders for spanned columns remember the spanning label for header lookups
+    cells = []
+    for cell in row:
+        cells.append(cell)
+        cells.extend(
+            {"text": "", "header": cell["header"], "colspan": 1, "spanned": cell["text"]}
+            for _ in range(cell["colspan"] - 1)
+        )
+    return cells
+
+def normalize_table(table_html, context=""):
+    """
+    Convert a text_as_html table into a NormalizedTable.
+    context is nearby text (e.g. the element before the table) searched for the scale note.
+    """
+    parser = _TableHTMLParser()
+    parser.feed(table_html)
+    rows = [_expand(row) for row in parser.rows if row]
+    width = max((len(row) for row in rows), default=0)
+    rows = [row + [{"text": "", "header": False, "colspan": 1}] * (width - len(row)) for row in rows]
+
+    # Header rows: <th>/<thead> rows, or failing that the first row
+    header_count = 0
+    while header_count < len(rows) and all(cell["header"] for cell in rows[header_count] if cell["text"]):
+        header_count += 1
+    if header_count == 0 and len(rows) > 1:
+        header_count = 1
+    header_rows, body_rows = rows[:header_count], rows[header_count:]
+
+    # Currency signs, "%" and ")" in cells of their own belong to the figure beside them;
+    # left in place they would take a value column of their own
+    for row in body_rows:
+        for j, cell in enumerate(row):
+            if j == 0 or cell.get("spanned") is not None or not SYMBOL_CELL_PATTERN.match(cell["text"]):
+                continue
+            step = -1 if cell["text"].strip() in "%)" else 1
+            k = j + step
+            while 0 < k < width and not row[k]["text"]:
+                k += step
+            if 0 < k < width:
+                merged = f"{row[k]['text']}{cell['text'].strip()}" if step < 0 else f"{cell['text'].strip()}{row[k]['text']}"
+                row[k] = {**row[k], "text": merged}
+                row[j] = {**cell, "text": ""}
+
+    # Spanned header labels ("Year Ended December 31,") apply to every column they cover
+    labels = []
+    for j in range(1, width):
+        parts = [row[j]["text"] or row[j].get("spanned", "") for row in header_rows]
+        labels.append(" ".join(part for part in parts if part) or f"column_{j}")
+
+    # Value columns are those with a cell in some body row; the rest held only symbols or padding
+    kept = [j for j in range(1, width) if not body_rows or any(row[j]["text"] for row in body_rows)]
+    # One header label per leaf header cell; when their count matches the value columns they are
+    # matched in order, so a body row wider than its header (a "$" cell the header lacks) still lines up
+    leaf_labels = [
+        labels[j - 1] for j in range(1, width)
+        if header_rows and "spanned" not in header_rows[-1][j] and any(row[j]["text"] or row[j].get("spanned") for row in header_rows)
+    ]
+    columns = leaf_labels if len(leaf_labels) == len(kept) else [labels[j - 1] for j in kept]
+
+    table_text = " ".join(cell["text"] for row in rows for cell in row)
+    scale, unit = detect_scale(table_text, context)
+
+    row_labels = []
+    values = np.full((len(body_rows), len(kept)), np.nan)
+    percent = np.zeros(values.shape, dtype=bool)
+    for i, row in enumerate(body_rows):
+        label = row[0]["text"]
+        row_labels.append(label)
+        label_scale, label_unit = detect_scale(label)
+        row_scale = label_scale if label_unit else 1.0 if UNSCALED_ROW_PATTERN.search(label) else scale
+        for j, column in enumerate(kept):
+            value, is_percent = parse_number(row[column]["text"])
+            percent[i, j] = is_percent
+            values[i, j] = value if is_percent else value * row_scale
+
+    return NormalizedTable(columns, row_labels, values, percent, scale, unit)
@@ -0,0 +1,210 @@
+'''
+Persisted TF-IDF retrieval, promoted from the script-local model of app_v1.
+
+The index keeps the fitted vocabulary and idf (the vectorizer) and the L2-normalized
+TF-IDF matrix in CSR form, saved per document so reopening a filing does not refit. A batch
+of questions is scored with one sparse product and the top k taken by argpartition.
+
+TfidfIndex has the interface of BM25Index, so it can stand in as the sparse side of a
+HybridMultiVectorRetriever; TfidfRetriever serves it on its own as a LangChain retriever.
+'''
+
+import os
+import json
+import threading
+import numpy as np
+from typing import Any
+from langchain_core.retrievers import BaseRetriever
+from FinChatbot.pipeline.numpy_store import top_k
+from FinChatbot.pipeline.sparse import tokenize
+
+class TfidfIndex:
+    """
+    TF-IDF over documents keyed by id: smooth idf, raw term counts, L2-normalized rows,
+    the defaults of sklearn's TfidfVectorizer.
+
+    Raw counts are kept next to the weights (same sparsity pattern) so documents can be added
+    or deleted later; the idf and weights are refit on the first search after a change.
+    With a path, save writes vectorizer.json and matrix.npz into that directory.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._ids = []
+        self._vocabulary = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.float32)
+        # Fitted state, None until the next fit after a change
+        self._idf = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        index = cls(path)
+        try:
+            with open(os.path.join(path, "vectorizer.json"), "r", encoding="utf-8") as f:
+                vectorizer = json.load(f)
+            with np.load(os.path.join(path, "matrix.npz")) as matrix:
+                indptr, indices = matrix["indptr"], matrix["indices"]
+                counts, data = matrix["counts"], matrix["data"]
+        except (OSError, ValueError, KeyError):
+            return index
+
+        if len(indptr) != len(vectorizer["ids"]) + 1:
+            return index
+        index._ids = vectorizer["ids"]
+        index._vocabulary = vectorizer["vocabulary"]
+        index._indptr, index._indices, index._counts = indptr, indices, counts
+        index._idf = np.asarray(vectorizer["idf"], dtype=np.float32)
+        index._data = data
+        return index
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            self._fit()
+            vectorizer = {"ids": self._ids, "vocabulary": self._vocabulary, "idf": self._idf.tolist()}
+            arrays = {"indptr": self._indptr, "indices": self._indices, "counts": self._counts, "data": self._data}
+            vectorizer = json.dumps(vectorizer)
+
+        os.makedirs(self.path, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        vectorizer_path = os.path.join(self.path, "vectorizer.json")
+        matrix_path = os.path.join(self.path, "matrix.npz")
+        with open(matrix_path + suffix, "wb") as f:
+            np.savez(f, **arrays)
+        with open(vectorizer_path + suffix, "w", encoding="utf-8") as f:
+            f.write(vectorizer)
+        os.replace(matrix_path + suffix, matrix_path)
+        os.replace(vectorizer_path + suffix, vectorizer_path)
+
+    def ids(self):
+        with self._lock:
+            return set(self._ids)
+
+    def _drop(self, ids):
+        """Remove the rows of ids from the count matrix. Caller holds the lock."""
+        ids = set(ids)
+        keep = np.array([doc_id not in ids for doc_id in self._ids], dtype=bool)
+        if keep.all():
+            return
+        lengths = np.diff(self._indptr)
+        row_of = np.repeat(np.arange(len(self._ids)), lengths)
+        nonzero = keep[row_of]
+        self._indices = self._indices[nonzero]
+        self._counts = self._counts[nonzero]
+        self._indptr = np.concatenate([[0], np.cumsum(lengths[keep])]).astype(np.int64)
+        self._ids = [doc_id for doc_id, kept in zip(self._ids, keep) if kept]
+
+    def add(self, ids, texts):
+        """Index texts under ids, replacing earlier entries with the same id."""
+        rows = []
+        for text in texts:
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            rows.append(counts)
+
+        with self._lock:
+            self._drop(ids)
+            indices, counts, lengths = [], [], []
+            for row in rows:
+                columns = sorted(self._vocabulary.setdefault(term, len(self._vocabulary)) for term in row)
+                terms = {self._vocabulary[term]: tf for term, tf in row.items()}
+                indices.extend(columns)
+                counts.extend(terms[column] for column in columns)
+                lengths.append(len(columns))
+            self._ids = self._ids + list(ids)
+            self._indices = np.concatenate([self._indices, np.asarray(indices, dtype=np.int64)])
+            self._counts = np.concatenate([self._counts, np.asarray(counts, dtype=np.float32)])
+            self._indptr = np.concatenate([self._indptr, self._indptr[-1] + np.cumsum(lengths, dtype=np.int64)])
+            self._idf = None
+
+    def delete(self, ids):
+        with self._lock:
+            self._drop(ids)
+            self._idf = None
+
+    def _fit(self):
+        """Refit idf and the normalized weights if the documents changed. Caller holds the lock."""
+        if self._idf is not None:
+            return
+        n = len(self._ids)
+        df = np.bincount(self._indices, minlength=len(self._vocabulary))
+        self._idf = (np.log((1 + n) / (1 + df)) + 1.0).astype(np.float32)
+        data = self._counts * self._idf[self._indices]
+        row_of = np.repeat(np.arange(n), np.diff(self._indptr))
+        norms = np.sqrt(np.bincount(row_of, weights=data ** 2, minlength=n)).astype(np.float32)
+        self._data = (data / np.where(norms == 0, 1.0, norms)[row_of]).astype(np.float32)
+
+    def _transform(self, queries):
+        """Normalized TF-IDF of queries as (query, column, weight) triples; unknown terms are dropped."""
+        query_rows, columns, weights = [], [], []
+        for q, query in enumerate(queries):
+            counts = {}
+            for token in tokenize(query):
+                column = self._vocabulary.get(token)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            if not counts:
+                continue
+            row_columns = np.fromiter(counts, dtype=np.int64)
+            row_weights = np.fromiter(counts.values(), dtype=np.float32) * self._idf[row_columns]
+            query_rows.extend([q] * len(counts))
+            columns.extend(row_columns.tolist())
+            weights.extend((row_weights / np.linalg.norm(row_weights)).tolist())
+        return np.asarray(query_rows, dtype=np.int64), np.asarray(columns, dtype=np.int64), np.asarray(weights, dtype=np.float32)
+
+    def search_batch(self, queries, k=4):
+        """Top k (id, cosine similarity) pairs per query; documents sharing no term are left out."""
+        queries = list(queries)
+        with self._lock:
+            self._fit()
+            ids, indptr, indices, data = self._ids, self._indptr, self._indices, self._data
+            query_rows, columns, weights = self._transform(queries)
+
+        scores = np.zeros((len(ids), len(queries)), dtype=np.float32)
+        if len(columns) and len(ids):
+            # Dense block of the query weights, over the columns the queries use
+            used = np.unique(columns)
+            block = np.zeros((len(queries), len(used)), dtype=np.float32)
+            block[query_rows, np.searchsorted(used, columns)] = weights
+
+            # Sparse product: only nonzeros in those columns contribute, summed per document row
+            hit = np.isin(indices, used)
+            if hit.any():
+                row_of = np.repeat(np.arange(len(ids)), np.diff(indptr))[hit]
+                contributions = data[hit][:, None] * block[:, np.searchsorted(used, indices[hit])].T
+                # Nonzeros are in row order, so each row is one contiguous run
+                starts = np.flatnonzero(np.r_[True, row_of[1:] != row_of[:-1]])
+                scores[row_of[starts]] = np.add.reduceat(contributions, starts, axis=0)
+
+        results = []
+        for q, rows in enumerate(top_k(scores.T, k)):
+            results.append([(ids[i], float(scores[i, q])) for i in rows if scores[i, q] > 0])
+        return results
+
+    def search(self, query, k=4):
+        return self.search_batch([query], k)[0]
+
+class TfidfRetriever(BaseRetriever):
+    """Retriever over a TfidfIndex, returning the parent documents of the hits from a docstore."""
+
+    index: Any
+    docstore: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        ids = [doc_id for doc_id, _ in self.index.search(query, self.k)]
+        return [doc for doc in self.docstore.mget(ids) if doc is not None]
+
+    def batch(self, inputs, config=None, **kwargs):
+        """Scores all questions in one sparse product instead of one search per question."""
+        hits = self.index.search_batch(inputs, self.k)
+        return [
+            [doc for doc in self.docstore.mget([doc_id for doc_id, _ in found]) if doc is not None]
+            for found in hits
+        ]
@@ -0,0 +1,263 @@
+'''
+Persisted per-document Chroma collections and NumPy indexes.
+
+Every ingested file gets its own collection, named by the hash of its bytes, in one
+persistent Chroma directory (or, for the 'numpy' backend, an index under numpy/ in it), so
+any session that opens the same filing reuses the vectors instead of building an ephemeral
+index again, and two filings that merely share a name never share an index. The sparse
+index of a document (BM25 or TF-IDF, see SPARSE_BACKEND) is kept beside its collection,
+under bm25/ or tfidf/, and its parent documents in the SQLite docstore under the collection
+name. Collections can be listed, deleted and pruned
+to keep disk usage bounded:
+
+    python -m FinChatbot.pipeline.vectorstores list
+    python -m FinChatbot.pipeline.vectorstores delete doc-3f2a...
+    python -m FinChatbot.pipeline.vectorstores prune --max-collections 50
+'''
+
+import os
+import time
+import shutil
+import argparse
+import threading
+import chromadb
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+from langchain_community.vectorstores import FAISS, Chroma
+from FinChatbot.pipeline.docstore import SQLiteDocStore, list_namespaces
+from FinChatbot.pipeline.mvr import create_multi_vector_retriever
+from FinChatbot.pipeline.numpy_store import NumpyVectorStore
+from FinChatbot.pipeline.sparse import BM25Index
+from FinChatbot.pipeline.tfidf import TfidfIndex
+
+load_dotenv(find_dotenv())
+
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", "./Database")
+VECTORSTORE_MAX_COLLECTIONS = int(os.getenv("VECTORSTORE_MAX_COLLECTIONS", "100"))
+# Sparse side of hybrid retrieval: 'bm25' or 'tfidf'
+SPARSE_BACKEND = os.getenv("SPARSE_BACKEND", "bm25")
+
+COLLECTION_PREFIX = "doc-"
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _client(persist_dir=VECTORSTORE_DIR):
+    """One PersistentClient per directory for the whole process, shared by all sessions."""
+    path = os.path.abspath(persist_dir)
+    with _clients_lock:
+        if path not in _clients:
+            os.makedirs(path, exist_ok=True)
+            _clients[path] = chromadb.PersistentClient(path=path)
+        return _clients[path]
+
+def collection_name(doc_hash):
+    """Collection name of a document; Chroma allows 3-63 characters."""
+    return f"{COLLECTION_PREFIX}{doc_hash[:40]}"
+
+def sparse_index_path(doc_hash, persist_dir=VECTORSTORE_DIR):
+    """Path of the BM25 index kept beside a document's collection."""
+    return os.path.join(persist_dir, "bm25", f"{collection_name(doc_hash)}.json")
+
+def open_sparse_index(doc_hash=None, backend=None, persist_dir=VECTORSTORE_DIR):
+    """
+    BM25Index or TfidfIndex of a document, loaded from beside its collection; without
+    doc_hash a fresh in-memory index.
+    """
+    backend = (backend or SPARSE_BACKEND).lower()
+    if backend == "bm25":
+        return BM25Index.load(sparse_index_path(doc_hash, persist_dir)) if doc_hash else BM25Index()
+    if backend == "tfidf":
+        return TfidfIndex.load(os.path.join(persist_dir, "tfidf", collection_name(doc_hash))) if doc_hash else TfidfIndex()
+    raise ValueError("Invalid sparse backend. Choose 'bm25' or 'tfidf'")
+
+def open_document_collection(doc_hash, embeddings, doc_key=None, persist_dir=VECTORSTORE_DIR):
+    """
+    Chroma vectorstore over the persisted collection of a document, created on first use.
+    Opening it records the time, which prune_collections uses to evict the least recently used.
+    """
+    client = _client(persist_dir)
+    name = collection_name(doc_hash)
+    metadata = {"doc_hash": doc_hash, "last_used": time.time()}
+    if doc_key:
+        metadata["doc_key"] = str(doc_key)
+
+    vectorstore = Chroma(client=client, collection_name=name, embedding_function=embeddings, collection_metadata=metadata)
+    # An existing collection keeps its old metadata on get_or_create; refresh the access time
+    collection = client.get_collection(name)
+    collection.modify(metadata={**(collection.metadata or {}), **metadata})
+    return vectorstore
+
+def open_numpy_index(doc_hash, embeddings, persist_dir=VECTORSTORE_DIR):
+    """NumpyVectorStore of a document, memory-mapped from its saved index if there is one."""
+    path = os.path.join(persist_dir, "numpy", collection_name(doc_hash))
+    vectorstore = NumpyVectorStore.load(embeddings, path)
+    try:
+        # The access time prune_collections goes by
+        os.utime(os.path.join(path, "documents.json"))
+    except OSError:
+        pass
+    return vectorstore
+
+def open_document_retriever(doc_hash, embeddings, vectorstore_type="chroma", doc_key=None, persist_dir=VECTORSTORE_DIR):
+    """
+    Hybrid multi-vector retriever over the indexes of a document, all keyed by the hash of its
+    bytes: the dense collection ('chroma' or 'numpy', persisted; 'faiss', in memory only), the
+    sparse index beside it and the docstore namespace of its parent documents. The chat app and
+    bulk ingest both index through it, so a filing ingested in bulk is opened as-is in a session.
+    """
+    vectorstore_type = vectorstore_type.lower()
+    if vectorstore_type == "chroma":
+        vectorstore = open_document_collection(doc_hash, embeddings, doc_key=doc_key, persist_dir=persist_dir)
+        sparse_index = open_sparse_index(doc_hash, persist_dir=persist_dir)
+    elif vectorstore_type == "numpy":
+        vectorstore = open_numpy_index(doc_hash, embeddings, persist_dir=persist_dir)
+        sparse_index = open_sparse_index(doc_hash, persist_dir=persist_dir)
+    elif vectorstore_type == "faiss":
+        vectorstore = FAISS.from_texts(
+            texts=[""],  # Initialize with empty text
+            embedding=embeddings
+        )
+        sparse_index = open_sparse_index()
+    else:
+        raise ValueError("Invalid vectorstore type. Choose 'chroma', 'faiss' or 'numpy'")
+
+    # Parent documents are kept on disk per file, under the name of its collection; ids are
+    # derived from the file and element hashes, so re-adding is a no-op
+    return create_multi_vector_retriever(
+        vectorstore=vectorstore,
+        table_summaries=[],
+        tables=[],
+        text_summaries=[],
+        texts=[],
+        docstore=SQLiteDocStore(namespace=collection_name(doc_hash)),
+        sparse_index=sparse_index
+    )
+
+def save_document_retriever(retriever):
+    """Persist what a document retriever keeps in memory: its sparse index and a NumPy index."""
+    retriever.sparse_index.save()
+    if isinstance(retriever.vectorstore, NumpyVectorStore):
+        retriever.vectorstore.save()
+
+def _numpy_indexes(persist_dir):
+    root = os.path.join(persist_dir, "numpy")
+    indexes = []
+    for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        try:
+            last_used = os.path.getmtime(os.path.join(root, name, "documents.json"))
+            count = len(np.load(os.path.join(root, name, "vectors.npy"), mmap_mode="r"))
+        except (OSError, ValueError):
+            last_used, count = 0.0, 0
+        indexes.append({"name": name, "backend": "numpy", "doc_key": None, "doc_hash": None,
+                        "count": count, "last_used": last_used})
+    return indexes
+
+def _collection_names(client):
+    # chromadb>=0.6 returns names, older versions Collection objects
+    return [str(c) if isinstance(c, str) else c.name for c in client.list_collections()]
+
+def list_collections(persist_dir=VECTORSTORE_DIR):
+    """
+    Document collections and NumPy indexes with their backend, doc key, vector count and
+    last use, most recent first; docstore namespaces with no index on disk come last.
+    """
+    client = _client(persist_dir)
+    collections = []
+    for name in _collection_names(client):
+        if not name.startswith(COLLECTION_PREFIX):
+            continue
+        collection = client.get_collection(name)
+        metadata = collection.metadata or {}
+        collections.append({
+            "name": name,
+            "backend": "chroma",
+            "doc_key": metadata.get("doc_key"),
+            "doc_hash": metadata.get("doc_hash"),
+            "count": collection.count(),
+            "last_used": metadata.get("last_used", 0.0),
+        })
+    collections.extend(_numpy_indexes(persist_dir))
+
+    # Parent documents of in-memory (faiss) sessions have no index on disk to go with them
+    listed = {collection["name"] for collection in collections}
+    for namespace, count in list_namespaces():
+        if namespace.startswith(COLLECTION_PREFIX) and namespace not in listed:
+            collections.append({"name": namespace, "backend": "docstore", "doc_key": None, "doc_hash": None,
+                                "count": count, "last_used": 0.0})
+    collections.sort(key=lambda c: c["last_used"], reverse=True)
+    return collections
+
+def delete_collection(name, persist_dir=VECTORSTORE_DIR):
+    """
+    Delete a document's collection, NumPy index, sparse indexes and docstore entries, by
+    name or document hash. Returns False if there was none of them.
+    """
+    if not name.startswith(COLLECTION_PREFIX):
+        name = collection_name(name)
+    docstore = SQLiteDocStore(namespace=name)
+    deleted = docstore.count() > 0
+    docstore.clear()
+    try:
+        os.remove(os.path.join(persist_dir, "bm25", f"{name}.json"))
+        deleted = True
+    except FileNotFoundError:
+        pass
+    for backend in ("numpy", "tfidf"):
+        index_path = os.path.join(persist_dir, backend, name)
+        if os.path.isdir(index_path):
+            shutil.rmtree(index_path)
+            deleted = True
+
+    client = _client(persist_dir)
+    if name in _collection_names(client):
+        client.delete_collection(name)
+        deleted = True
+    return deleted
+
+def prune_collections(max_collections=VECTORSTORE_MAX_COLLECTIONS, max_age_days=None, persist_dir=VECTORSTORE_DIR):
+    """
+    Delete the least recently used collections beyond max_collections, and any unused for
+    more than max_age_days. Returns the names of the deleted collections.
+    """
+    # A document indexed by both backends counts once, by its most recent use
+    collections, seen = [], set()
+    for collection in list_collections(persist_dir):
+        if collection["name"] not in seen:
+            seen.add(collection["name"])
+            collections.append(collection)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+
+    deleted = []
+    for i, collection in enumerate(collections):
+        expired = cutoff is not None and collection["last_used"] < cutoff
+        if i >= max_collections or expired:
+            if delete_collection(collection["name"], persist_dir):
+                deleted.append(collection["name"])
+    return deleted
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the persisted per-document vector indexes")
+    parser.add_argument("--dir", default=VECTORSTORE_DIR, help="Chroma persist directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List document collections, most recently used first")
+    delete = commands.add_parser("delete", help="Delete collections by name or document hash")
+    delete.add_argument("names", nargs="+")
+    prune = commands.add_parser("prune", help="Delete least recently used collections")
+    prune.add_argument("--max-collections", type=int, default=VECTORSTORE_MAX_COLLECTIONS)
+    prune.add_argument("--max-age-days", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for collection in list_collections(args.dir):
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(collection["last_used"]))
+            print(f"{collection['name']}  {collection['backend']:<6}  {collection['count']:>7} vectors  {last_used}  {collection['doc_key'] or ''}")
+    elif args.command == "delete":
+        for name in args.names:
+            print(f"{name}: {'deleted' if delete_collection(name, args.dir) else 'not found'}")
+    else:
+        for name in prune_collections(args.max_collections, args.max_age_days, args.dir):
+            print(f"deleted {name}")
+
+if __name__ == "__main__":
+    main()
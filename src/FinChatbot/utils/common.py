@@ -9,9 +9,10 @@ def call_data(file_path: Path):
         file_path (Path): Path object pointing to the PDF file to be processed.
 
     Returns:
-        List[str], List[str]: Two lists:
-            - tables: List of HTML-formatted strings representing tables from the PDF
-            - texts: List of strings containing extracted text content
+        List[Element], List[Element]: Two lists:
+            - tables: Table elements whose content is the HTML-formatted table
+            - texts: Text elements containing extracted text content
+            Each element keeps its page number, element and parent ids and coordinates.
     """
     
     with open(file_path, "rb") as file: